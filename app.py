@@ -1,132 +1,583 @@
-from flask import Flask, render_template, request, jsonify
-import pandas as pd
-import numpy as np
-import json
+from flask import Flask, render_template, request, jsonify, g
+import hmac
+import math
 import os
-from sklearn.neural_network import MLPClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.cluster import AgglomerativeClustering
-from sklearn.preprocessing import LabelBinarizer, StandardScaler
-from sklearn.model_selection import train_test_split
-import plotly.graph_objs as go
-import plotly.utils
-import folium
-from datetime import datetime
+import signal
+import threading
+import time
+import evaluation
+import metrics
+import model_store
+from model_snapshot import ModelSnapshot
+from response_cache import ResponseCache
+
+# pandas, numpy and scikit-learn are imported where they are used so the app
+# can start serving before they are loaded, see benchmarks/import_budget.py
 
 app = Flask(__name__)
 
+DATA_FILE = os.environ.get('DATA_FILE', 'allData.csv')
+
+# Keep predictor.data in compact types (float32, int16, categoricals), see
+# columnar_store.compact_frame. Set SLIM_DATA=0 for the types read from disk.
+SLIM_DATA = os.environ.get('SLIM_DATA', '1').lower() in ('1', 'true', 'yes')
+
+# Seconds between checks for a new data file or model artifact, 0 disables.
+# Under gunicorn the master watches instead, see gunicorn.conf.py.
+MODEL_WATCH_SECONDS = float(os.environ.get('MODEL_WATCH_SECONDS', '0'))
+
+def make_mlp():
+    # Parameters found by mlp_search.py override the defaults
+    from sklearn.neural_network import MLPClassifier
+    import mlp_search
+    params = dict(hidden_layer_sizes=(64, 32), max_iter=1000, random_state=42)
+    params.update(mlp_search.load_params())
+    return MLPClassifier(**params)
+
+def make_logistic():
+    from sklearn.linear_model import LogisticRegression
+    return LogisticRegression(random_state=42, max_iter=1000)
+
+def make_hac():
+    # HAC on a bounded sample, served through its cluster centroids
+    from clustering import CentroidClusterer
+    return CentroidClusterer(n_clusters=2, random_state=42)
+
+# Unfitted estimator per model name, shared by training and evaluation.py
+MODEL_FACTORIES = {
+    'mlp': make_mlp,
+    'logistic': make_logistic,
+    'hac': make_hac,
+}
+
+def training_split(X, y):
+    """
+    Scale the features and split off the training rows the production models are fitted on
+    
+    Returns:
+        tuple: (fitted scaler, X_train, X_test, y_train, y_test)
+    """
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.model_selection import train_test_split
+    
+    scaler = StandardScaler()
+    X_train, X_test, y_train, y_test = train_test_split(scaler.fit_transform(X), y, test_size=0.25, random_state=42)
+    return scaler, X_train, X_test, y_train, y_test
+
 class AvalanchePredictor:
     def __init__(self):
-        self.data = None
-        self.models = {}
-        self.scaler = StandardScaler()
-        self.label_binarizer = LabelBinarizer()
-        self.feature_columns = ['maxtempC', 'mintempC', 'totalSnow_cm', 'tempC', 
-                               'windspeedKmph', 'winddirDegree', 'precipMM', 'humidity']
-        
-    def load_data(self, file_path='allData.csv'):
-        """Load and preprocess the avalanche data"""
-        try:
-            self.data = pd.read_csv(file_path)
-            print(f"Loaded data shape: {self.data.shape}")
-            
-            # Clean the data - remove rows with NaN in feature columns
-            feature_cols = self.feature_columns + ['Dangerous']
-            self.data = self.data.dropna(subset=feature_cols)
-            print(f"After cleaning shape: {self.data.shape}")
-            
-            # Convert Dangerous column to boolean if it's not already
-            if self.data['Dangerous'].dtype == 'object':
-                self.data['Dangerous'] = self.data['Dangerous'].map({'TRUE': True, 'FALSE': False})
-            else:
-                # Already boolean, just ensure it's proper boolean type
-                self.data['Dangerous'] = self.data['Dangerous'].astype(bool)
-            
-            # Ensure all feature columns are numeric
-            for col in self.feature_columns:
-                if col in self.data.columns:
-                    self.data[col] = pd.to_numeric(self.data[col], errors='coerce')
-            
-            # Fix Depth column - convert to numeric and handle corrupted values
-            if 'Depth' in self.data.columns:
-                self.data['Depth'] = pd.to_numeric(self.data['Depth'], errors='coerce')
-                self.data['Depth'] = self.data['Depth'].fillna(0)
-            
-            # Fix Width column - convert to numeric and handle corrupted values  
-            if 'Width' in self.data.columns:
-                self.data['Width'] = pd.to_numeric(self.data['Width'], errors='coerce')
-                self.data['Width'] = self.data['Width'].fillna(0)
-            
-            # Remove any remaining NaN values
-            self.data = self.data.dropna(subset=self.feature_columns + ['Dangerous'])
-            print(f"Final data shape: {self.data.shape}")
-            
+        # Data, scaler and models are published together as one immutable
+        # snapshot, see model_snapshot.py
+        self.snapshot = ModelSnapshot(feature_columns=['maxtempC', 'mintempC', 'totalSnow_cm', 'tempC', 
+                                                       'windspeedKmph', 'winddirDegree', 'precipMM', 'humidity'])
+        # Columns the API needs besides the features
+        self.data_columns = ['Date', 'Location', 'Area', 'latitude', 'longitude',
+                             'Depth', 'Width', 'Dangerous']
+        self.weather_store = None
+        # Model used when a request does not name one, see evaluation.py
+        self.default_model = evaluation.selected_model()
+        # Serializes loading, training and reloads so concurrent callers share one run
+        self._init_lock = threading.RLock()
+    
+    # Read-only views of the current snapshot. Code that reads more than one
+    # of them for a request should take predictor.snapshot once instead.
+    data = property(lambda self: self.snapshot.data)
+    data_file = property(lambda self: self.snapshot.data_file)
+    data_hash = property(lambda self: self.snapshot.data_hash)
+    feature_columns = property(lambda self: self.snapshot.feature_columns)
+    scaler = property(lambda self: self.snapshot.scaler)
+    models = property(lambda self: self.snapshot.models)
+    
+    @property
+    def ready(self):
+        """True once data and models are loaded and predictions can be served"""
+        return self.snapshot.ready
+    
+    def _publish(self, **changes):
+        """Replace some fields of the current snapshot in one swap"""
+        with self._init_lock:
+            self.snapshot = self.snapshot.replace(**changes)
+    
+    def ensure_data(self):
+        """Load the data unless it is loaded already, waiting for a load in progress"""
+        if self.data is not None:
+            return True
+        with self._init_lock:
+            if self.data is not None:
+                return True
+            return self.load_data()
+    
+    def ensure_models(self):
+        """Load or train the models unless they are ready, waiting for a run in progress"""
+        if self.ready:
+            return True
+        with self._init_lock:
+            if self.ready:
+                return True
+            return self.ensure_data() and self.load_or_train()
+    
+    def ensure_weather_store(self):
+        """Load the weather store unless it is loaded already"""
+        if self.weather_store is not None:
             return True
+        with self._init_lock:
+            if self.weather_store is not None:
+                return True
+            return self.load_weather_store()
+    
+    def load_data(self, file_path=None, columns=None):
+        """
+        Load and preprocess the avalanche data
+        
+        Args:
+            file_path (str): CSV file or columnar (.parquet/.feather) store, defaults to DATA_FILE
+            columns (list): Columns to read, defaults to the feature columns
+                plus the columns used by the API
+        """
+        file_path = file_path or DATA_FILE
+        try:
+            data, data_hash = self.read_data(file_path, columns)
         except Exception as e:
             print(f"Error loading data: {e}")
             return False
+        
+        # Publish only the fully cleaned frame, other threads may be reading
+        self._publish(data=data, data_file=file_path, data_hash=data_hash)
+        return True
+    
+    @metrics.DATA_LOAD_SECONDS.timed()
+    def read_data(self, file_path=None, columns=None, slim=None):
+        """
+        Read and clean the avalanche data without publishing it
+        
+        Args:
+            file_path (str): CSV file or columnar (.parquet/.feather) store, defaults to DATA_FILE
+            columns (list): Columns to read, defaults to the feature columns
+                plus the columns used by the API
+            slim (bool): Compact the column types, defaults to SLIM_DATA
+        
+        Returns:
+            tuple: (cleaned DataFrame, SHA-256 of the file)
+        """
+        import pandas as pd
+        import columnar_store
+        
+        file_path = file_path or DATA_FILE
+        columns = columns or self.feature_columns + self.data_columns
+        if columnar_store.is_store(file_path):
+            data = columnar_store.read_store(file_path, columns)
+        else:
+            wanted = set(columns)
+            data = pd.read_csv(file_path, usecols=lambda col: col in wanted)
+        data_hash = model_store.file_hash(file_path)
+        print(f"Loaded data shape: {data.shape}")
+        
+        # Clean the data - remove rows with NaN in feature columns
+        feature_cols = self.feature_columns + ['Dangerous']
+        data = data.dropna(subset=feature_cols)
+        print(f"After cleaning shape: {data.shape}")
+        
+        # Convert Dangerous column to boolean if it's not already
+        if data['Dangerous'].dtype == 'object':
+            data['Dangerous'] = data['Dangerous'].map({'TRUE': True, 'FALSE': False})
+        else:
+            # Already boolean, just ensure it's proper boolean type
+            data['Dangerous'] = data['Dangerous'].astype(bool)
+        
+        # Ensure all feature columns are numeric
+        for col in self.feature_columns:
+            if col in data.columns:
+                data[col] = pd.to_numeric(data[col], errors='coerce')
+        
+        # Fix Depth column - convert to numeric and handle corrupted values
+        if 'Depth' in data.columns:
+            data['Depth'] = pd.to_numeric(data['Depth'], errors='coerce')
+            data['Depth'] = data['Depth'].fillna(0)
+        
+        # Fix Width column - convert to numeric and handle corrupted values  
+        if 'Width' in data.columns:
+            data['Width'] = pd.to_numeric(data['Width'], errors='coerce')
+            data['Width'] = data['Width'].fillna(0)
+        
+        # Remove any remaining NaN values
+        data = data.dropna(subset=self.feature_columns + ['Dangerous'])
+        print(f"Final data shape: {data.shape}")
+        
+        if SLIM_DATA if slim is None else slim:
+            before = data.memory_usage(deep=True).sum()
+            # Models are trained on the features and the dashboard aggregates
+            # them, keep them as read so both match SLIM_DATA=0
+            data = columnar_store.compact_frame(
+                data, columnar_store.FULL_PRECISION_COLUMNS + self.feature_columns)
+            after = data.memory_usage(deep=True).sum()
+            print(f"Data in memory: {before / 2**20:.2f} MiB -> {after / 2**20:.2f} MiB")
+        
+        return data, data_hash
     
+    @metrics.MODEL_LOAD_SECONDS.timed(source='train')
     def train_models(self):
         """Train all ML models"""
-        if self.data is None:
+        snapshot = self.snapshot
+        if snapshot.data is None:
             return False
-            
-        # Prepare features and labels
-        X = self.data[self.feature_columns].values
-        y = self.data['Dangerous'].values
         
-        # Scale features
-        X_scaled = self.scaler.fit_transform(X)
+        # Prepare features and labels
+        X = snapshot.data[snapshot.feature_columns].to_numpy(dtype='float64')
+        y = snapshot.data['Dangerous'].values
+        scaler, X_train, X_test, y_train, y_test = training_split(X, y)
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.25, random_state=42)
+        models = {}
+        for name, make_model in MODEL_FACTORIES.items():
+            models[name] = make_model().fit(X_train, y_train)
         
-        # Train MLP Classifier
-        self.models['mlp'] = MLPClassifier(
-            hidden_layer_sizes=(64, 32), 
-            max_iter=1000, 
-            random_state=42
-        )
-        self.models['mlp'].fit(X_train, y_train)
+        # Swap in the scaler and the models together once all are fitted
+        with self._init_lock:
+            self.snapshot = snapshot.replace(scaler=scaler, models=models, version='trained')
+        return True
+    
+    def save_models(self, artifact_dir=None):
+        """Save the fitted scaler and models as an artifact for the loaded data"""
+        if not self.models or self.data_hash is None:
+            return None
+        try:
+            path = model_store.save_artifact(model_store.build_artifact(self), artifact_dir)
+            print(f"Saved model artifact to {path}")
+            return path
+        except Exception as e:
+            print(f"Error saving model artifact: {e}")
+            return None
+    
+    @metrics.MODEL_LOAD_SECONDS.timed(source='artifact')
+    def load_models(self, artifact_dir=None):
+        """Load fitted models from an artifact matching the loaded data"""
+        if self.data_hash is None:
+            return False
+        artifact = model_store.load_artifact(self.data_hash, artifact_dir)
+        if artifact is None:
+            return False
+        self._publish(feature_columns=artifact['feature_columns'], scaler=artifact['scaler'],
+                      models=artifact['models'], version=artifact['created_at'])
+        print(f"Loaded model artifact created {artifact['created_at']}")
+        return True
+    
+    def load_or_train(self, artifact_dir=None):
+        """Warm-start models from disk, retraining only when the data has changed"""
+        if self.load_models(artifact_dir):
+            return True
+        if not self.train_models():
+            return False
+        self.save_models(artifact_dir)
+        return True
+    
+    def load_snapshot(self, file_path=None, artifact_dir=None):
+        """
+        Build a complete snapshot from a data file and its saved artifact, leaving the current one alone
         
-        # Train Logistic Regression
-        self.models['logistic'] = LogisticRegression(random_state=42, max_iter=1000)
-        self.models['logistic'].fit(X_train, y_train)
+        Returns:
+            ModelSnapshot: Warmed-up snapshot, None if the data has no artifact
+        """
+        file_path = file_path or self.data_file or DATA_FILE
+        data, data_hash = self.read_data(file_path)
+        with metrics.MODEL_LOAD_SECONDS.time(source='artifact'):
+            artifact = model_store.load_artifact(data_hash, artifact_dir)
+        if artifact is None:
+            return None
+        snapshot = ModelSnapshot(data, file_path, data_hash, artifact['feature_columns'], artifact['scaler'],
+                                 artifact['models'], version=artifact['created_at'])
+        snapshot.warm_up()
+        return snapshot
+    
+    def reload(self, file_path=None, artifact_dir=None):
+        """
+        Load the newest data and artifact and swap them in as one snapshot
         
-        # Train HAC (for clustering)
-        self.models['hac'] = AgglomerativeClustering(n_clusters=2)
-        self.models['hac'].fit(X_scaled)
+        Requests keep being served from the current snapshot while the new one
+        loads. The new snapshot is built without holding the init lock, so
+        lazy loads in request threads do not wait for it. Does not train, a
+        data change without a matching artifact is left for
+        `python model_store.py` to build.
         
+        Returns:
+            bool: True if a new snapshot was swapped in
+        """
+        try:
+            snapshot = self.load_snapshot(file_path, artifact_dir)
+        except Exception as e:
+            print(f"Error reloading models: {e}")
+            metrics.MODEL_RELOADS.inc(result='failed')
+            return False
+        if snapshot is None:
+            print(f"No model artifact for {file_path or self.data_file or DATA_FILE} yet, keeping the current models")
+            metrics.MODEL_RELOADS.inc(result='no_artifact')
+            return False
+        with self._init_lock:
+            current = self.snapshot
+            # Also covers another reload that swapped in the same artifact meanwhile
+            unchanged = current.ready and (current.data_hash, current.version) == (snapshot.data_hash, snapshot.version)
+            if not unchanged:
+                self.snapshot = snapshot
+        if unchanged:
+            print(f"Already serving the models from artifact created {snapshot.version}")
+            metrics.MODEL_RELOADS.inc(result='unchanged')
+            return False
+        metrics.MODEL_RELOADS.inc(result='swapped')
+        print(f"Swapped in models from artifact created {snapshot.version}")
         return True
     
-    def predict(self, weather_data, model_type='mlp'):
-        """Make prediction using specified model"""
-        if model_type not in self.models:
+    def load_weather_store(self, file_path=None):
+        """Load the daily weather history used to look up features by location and date"""
+        from weather_store import WeatherStore, WEATHER_FILE
+        
+        try:
+            self.weather_store = WeatherStore.from_csv(file_path or WEATHER_FILE, self.feature_columns)
+            print(f"Loaded weather for {len(self.weather_store.locations)} locations")
+            return True
+        except Exception as e:
+            print(f"Error loading weather store: {e}")
+            return False
+    
+    def weather_features(self, locations, dates, columns=None):
+        """
+        Feature matrix for (location, date) pairs from the weather store
+        
+        Returns:
+            np.ndarray: One row of columns (default feature_columns) per pair, NaN where no weather is known
+        """
+        if not self.ensure_weather_store():
+            raise RuntimeError('Weather data is not available')
+        return self.weather_store.features(locations, dates, columns or self.feature_columns)
+    
+    def _score(self, model, model_type, weather_scaled):
+        """Score scaled rows with one model, returning (labels, probabilities)"""
+        import numpy as np
+        
+        metrics.MODEL_REQUESTS.inc(model=model_type)
+        metrics.MODEL_ROWS.inc(len(weather_scaled), model=model_type)
+        if not hasattr(model, 'predict_proba'):
+            with metrics.MODEL_SECONDS.time(model=model_type):
+                return model.predict(weather_scaled).astype(bool), None
+        
+        # Derive labels from the probabilities instead of a second predict pass
+        with metrics.MODEL_SECONDS.time(model=model_type):
+            probabilities = model.predict_proba(weather_scaled)
+        best = probabilities.argmax(axis=1)
+        labels = model.classes_[best].astype(bool)
+        return labels, probabilities[np.arange(len(best)), best]
+    
+    def predict(self, weather_data, model_type=None, snapshot=None):
+        """Make prediction using specified model, the default model if none is given"""
+        import numpy as np
+        
+        # One snapshot for the whole call, a reload can swap in another meanwhile
+        snapshot = snapshot or self.snapshot
+        model_type = model_type or self.default_model
+        if model_type not in snapshot.models:
             return None
             
         # Scale the input data
         weather_array = np.array([weather_data]).reshape(1, -1)
-        weather_scaled = self.scaler.transform(weather_array)
+        with metrics.SCALER_SECONDS.time():
+            weather_scaled = snapshot.scaler.transform(weather_array)
         
-        if model_type == 'hac':
-            prediction = self.models[model_type].predict(weather_scaled)[0]
-            return bool(prediction)
-        else:
-            prediction = self.models[model_type].predict(weather_scaled)[0]
-            probability = self.models[model_type].predict_proba(weather_scaled)[0]
-            return {
-                'prediction': bool(prediction),
-                'probability': float(max(probability))
+        labels, probabilities = self._score(snapshot.models[model_type], model_type, weather_scaled)
+        if probabilities is None:
+            return bool(labels[0])
+        return {
+            'prediction': bool(labels[0]),
+            'probability': float(probabilities[0])
+        }
+    
+    def predict_many(self, weather_rows, model_types=None, snapshot=None):
+        """
+        Score many rows of weather features in one vectorized pass per model
+        
+        Args:
+            weather_rows: N x len(feature_columns) array-like, or a DataFrame
+                containing the feature columns
+            model_types: Models to score the rows with, defaults to the default model
+            snapshot (ModelSnapshot): Snapshot to score with, defaults to the current one
+        
+        Returns:
+            dict: Model name -> {'prediction': [...], 'probability': [...]}
+        """
+        import numpy as np
+        import pandas as pd
+        
+        snapshot = snapshot or self.snapshot
+        model_types = model_types or [self.default_model]
+        unknown = [model_type for model_type in model_types if model_type not in snapshot.models]
+        if unknown:
+            raise ValueError(f"Unknown model(s): {', '.join(unknown)}")
+        
+        if isinstance(weather_rows, pd.DataFrame):
+            weather_rows = weather_rows[snapshot.feature_columns].to_numpy(dtype=np.float64)
+        weather_array = np.asarray(weather_rows, dtype=np.float64).reshape(-1, len(snapshot.feature_columns))
+        with metrics.SCALER_SECONDS.time():
+            weather_scaled = snapshot.scaler.transform(weather_array)
+        
+        results = {}
+        for model_type in model_types:
+            labels, probabilities = self._score(snapshot.models[model_type], model_type, weather_scaled)
+            results[model_type] = {
+                'prediction': labels.tolist(),
+                'probability': None if probabilities is None else probabilities.tolist()
             }
+        return results
 
 # Initialize the predictor
 predictor = AvalanchePredictor()
+response_cache = ResponseCache()
+
+metrics.gauge('avalanche_response_cache_hits', 'Dashboard responses served from the cache',
+              lambda: response_cache.hits)
+metrics.gauge('avalanche_response_cache_misses', 'Dashboard responses that had to be computed',
+              lambda: response_cache.misses)
+metrics.gauge('avalanche_response_cache_hit_ratio', 'Share of dashboard responses served from the cache',
+              lambda: response_cache.hit_ratio)
+metrics.gauge('avalanche_models_ready', '1 once data and models are loaded', lambda: predictor.ready)
+
+def initialize_predictor():
+    """Load data and models, warm-starting from a saved artifact when possible"""
+    if predictor.ensure_models():
+        print("Models ready!")
+
+def reload_predictor():
+    """
+    Swap in the data file and its saved model artifact as they are on disk now
+
+    Returns:
+        bool: True if a new snapshot was swapped in
+    """
+    previous = predictor.snapshot
+    if not predictor.reload():
+        return False
+    if predictor.data_hash != previous.data_hash:
+        warm_responses(predictor.snapshot)
+    return True
+
+_reload_thread = None
+_reload_lock = threading.Lock()
+
+def start_reload():
+    """
+    Reload in a background thread unless a reload is already running
+    
+    Returns:
+        bool: True if a reload was started
+    """
+    global _reload_thread
+    with _reload_lock:
+        if _reload_thread is not None and _reload_thread.is_alive():
+            return False
+        _reload_thread = threading.Thread(target=reload_predictor, name='predictor-reload', daemon=True)
+        _reload_thread.start()
+        return True
+
+def model_files():
+    """
+    The data file and the artifact directory, watched for changes
+    
+    The directory rather than one artifact: after the data changes, its
+    artifact is only written later and under the new data's hash.
+    """
+    return [predictor.snapshot.data_file or DATA_FILE, model_store.ARTIFACT_DIR]
+
+def artifact_on_disk():
+    """Path of the saved artifact for the data file as it is on disk now, None if there is none yet"""
+    path = model_store.artifact_path(model_store.file_hash(predictor.snapshot.data_file or DATA_FILE))
+    return path if os.path.exists(path) else None
+
+def reload_new_artifact():
+    """Reload when the data on disk has an artifact, otherwise wait for `python model_store.py`"""
+    if artifact_on_disk() is None:
+        print("Data changed but has no model artifact yet, keeping the current models")
+        return False
+    return reload_predictor()
+
+def start_model_watcher(interval=MODEL_WATCH_SECONDS):
+    """Hot-swap the models whenever the data file or its artifact changes"""
+    if interval <= 0:
+        return None
+    return model_store.ArtifactWatcher(model_files, reload_new_artifact, interval).start()
+
+def start_background_init():
+    """Load data and models in a background thread so the server can answer immediately"""
+    def init():
+        initialize_predictor()
+        # Watch only once the loaded files, and so the artifact path, are known
+        start_model_watcher()
+    
+    thread = threading.Thread(target=init, name='predictor-init', daemon=True)
+    thread.start()
+    return thread
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    """Count every request and time it by route pattern, which keeps label values bounded"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route)
+        metrics.REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+    return response
 
 @app.route('/')
 def index():
     """Main dashboard page"""
     return render_template('index.html')
 
+@app.route('/health')
+def health():
+    """Liveness check that answers without waiting for data or models"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/ready')
+def ready():
+    """Readiness check, 503 until the data and models are loaded"""
+    snapshot = predictor.snapshot
+    if not snapshot.ready:
+        return jsonify({'status': 'loading'}), 503
+    return jsonify({
+        'status': 'ready',
+        'models': sorted(snapshot.models),
+        'default_model': predictor.default_model,
+        'version': snapshot.version,
+        'loaded_at': snapshot.loaded_at,
+    })
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Load the newest model artifact in the background and swap it in"""
+    token = os.environ.get('ADMIN_TOKEN')
+    if not token:
+        return jsonify({'error': 'Not found'}), 404
+    
+    supplied = request.headers.get('Authorization', '')
+    if supplied.startswith('Bearer '):
+        supplied = supplied[len('Bearer '):]
+    if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+        return jsonify({'error': 'Invalid admin token'}), 403
+    
+    master_pid = os.environ.get('GUNICORN_MASTER_PID')
+    if master_pid:
+        # Preloaded gunicorn: the master swaps the snapshot and then replaces
+        # its workers gracefully, so all of them serve the new models
+        os.kill(int(master_pid), signal.SIGHUP)
+        return jsonify({'status': 'reloading', 'scope': 'all workers'}), 202
+    
+    started = start_reload()
+    return jsonify({'status': 'reloading' if started else 'already reloading',
+                    'version': predictor.snapshot.version}), 202
+
+@app.route('/metrics')
+def get_metrics():
+    """Metrics for this process in the Prometheus text format"""
+    return app.response_class(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/test')
 def test():
     """Test page for debugging"""
@@ -159,117 +610,262 @@ def test():
     </html>
     '''
 
-@app.route('/api/data')
-def get_data():
-    """API endpoint to get data summary"""
-    if predictor.data is None:
-        if not predictor.load_data():
-            return jsonify({'error': 'Failed to load data'}), 500
-    
-    # Get basic statistics
-    stats = {
-        'total_records': int(len(predictor.data)),
-        'dangerous_count': int(predictor.data['Dangerous'].sum()),
-        'safe_count': int((~predictor.data['Dangerous']).sum()),
-        'locations': int(predictor.data['Location'].nunique()),
+def cached_response(name, build, snapshot):
+    """The cached response for an endpoint, built from the given snapshot if needed"""
+    def timed_build():
+        with metrics.RESPONSE_BUILD_SECONDS.time(endpoint=name):
+            return build(snapshot)
+    
+    return response_cache.get(name, snapshot.data_hash, timed_build)
+
+def warm_responses(snapshot):
+    """Build the dashboard responses for a newly swapped-in dataset before requests ask for them"""
+    for name, build in DASHBOARD_RESPONSES.items():
+        cached_response(name, build, snapshot)
+
+def cached_json(name, build):
+    """Serve a pre-serialized JSON summary of the current dataset, honouring If-None-Match"""
+    if not predictor.ensure_data():
+        return jsonify({'error': 'Failed to load data'}), 500
+    
+    entry = cached_response(name, build, predictor.snapshot)
+    response = app.response_class(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def format_date(value):
+    """Dates from a columnar store are timestamps, CSV dates are already strings"""
+    return value.strftime('%Y-%m-%d') if hasattr(value, 'strftime') else str(value)
+
+def build_data_summary(snapshot):
+    """Basic statistics about the dataset"""
+    data = snapshot.data
+    return {
+        'total_records': int(len(data)),
+        'dangerous_count': int(data['Dangerous'].sum()),
+        'safe_count': int((~data['Dangerous']).sum()),
+        'locations': int(data['Location'].nunique()),
         'date_range': {
-            'start': str(predictor.data['Date'].min()),
-            'end': str(predictor.data['Date'].max())
+            'start': format_date(data['Date'].min()),
+            'end': format_date(data['Date'].max())
         }
     }
-    
-    return jsonify(stats)
 
-@app.route('/api/locations')
-def get_locations():
-    """Get location data for mapping"""
-    if predictor.data is None:
-        if not predictor.load_data():
-            return jsonify({'error': 'Failed to load data'}), 500
-    
-    locations = predictor.data.groupby(['Area', 'latitude', 'longitude']).agg({
+def build_locations(snapshot):
+    """Per-location event counts for mapping"""
+    # observed=True: only the Area categories that occur, not every combination
+    locations = snapshot.data.groupby(['Area', 'latitude', 'longitude'], observed=True).agg({
         'Dangerous': ['count', 'sum'],
         'Depth': 'mean'
     }).reset_index()
     
     locations.columns = ['Location', 'latitude', 'longitude', 'total_events', 'dangerous_events', 'avg_depth']
     locations['danger_rate'] = locations['dangerous_events'] / locations['total_events']
-    
-    # Convert to native Python types for JSON serialization
-    locations_dict = locations.to_dict('records')
-    for location in locations_dict:
-        for key, value in location.items():
-            if hasattr(value, 'item'):  # numpy scalar
-                location[key] = value.item()
-            elif hasattr(value, 'tolist'):  # numpy array
-                location[key] = value.tolist()
-    
-    return jsonify(locations_dict)
+    return locations.to_dict('records')
+
+def build_weather_stats(snapshot):
+    """Summary statistics of each weather feature"""
+    data = snapshot.data
+    columns = [col for col in snapshot.feature_columns if col in data.columns]
+    # Accumulate in float64 even when the data is stored as int16
+    summary = data[columns].astype('float64').agg(['mean', 'std', 'min', 'max'])
+    return {
+        col: {stat: float(summary.at[stat, col]) for stat in summary.index}
+        for col in columns
+    }
+
+def build_correlation(snapshot):
+    """Correlation matrix of the weather features and the danger label"""
+    return snapshot.data[snapshot.feature_columns + ['Dangerous']].corr().to_dict()
+
+# Cached dashboard responses, rebuilt for each new dataset
+DASHBOARD_RESPONSES = {
+    'data': build_data_summary,
+    'locations': build_locations,
+    'weather_stats': build_weather_stats,
+    'correlation': build_correlation,
+}
+
+@app.route('/api/data')
+def get_data():
+    """API endpoint to get data summary"""
+    return cached_json('data', build_data_summary)
+
+@app.route('/api/locations')
+def get_locations():
+    """Get location data for mapping"""
+    return cached_json('locations', build_locations)
 
 @app.route('/api/weather_stats')
 def get_weather_stats():
     """Get weather statistics for visualization"""
-    if predictor.data is None:
-        if not predictor.load_data():
-            return jsonify({'error': 'Failed to load data'}), 500
-    
-    weather_stats = {}
-    for col in predictor.feature_columns:
-        if col in predictor.data.columns:
-            weather_stats[col] = {
-                'mean': float(predictor.data[col].mean()),
-                'std': float(predictor.data[col].std()),
-                'min': float(predictor.data[col].min()),
-                'max': float(predictor.data[col].max())
-            }
-    
-    return jsonify(weather_stats)
+    return cached_json('weather_stats', build_weather_stats)
 
 @app.route('/api/predict', methods=['POST'])
 def predict():
     """Make avalanche prediction"""
-    if predictor.data is None:
-        if not predictor.load_data():
-            return jsonify({'error': 'Failed to load data'}), 500
-    
-    if not predictor.models:
-        if not predictor.train_models():
-            return jsonify({'error': 'Failed to train models'}), 500
+    if not predictor.ensure_models():
+        return jsonify({'error': 'Failed to load models'}), 500
     
+    snapshot = predictor.snapshot
     data = request.get_json()
-    model_type = data.get('model', 'mlp')
+    model_type = data.get('model', predictor.default_model)
+    
+    # Features not given explicitly can come from the recorded weather for a location and date
+    known_weather = {}
+    if 'location' in data and 'date' in data:
+        try:
+            values = predictor.weather_features([data['location']], [data['date']], snapshot.feature_columns)[0]
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        known_weather = {col: value for col, value in zip(snapshot.feature_columns, values) if not math.isnan(value)}
+        if not known_weather:
+            return jsonify({'error': f"No weather recorded for location {data['location']} on {data['date']}"}), 404
     
     # Extract weather parameters
     weather_data = []
-    for col in predictor.feature_columns:
-        weather_data.append(float(data.get(col, 0)))
+    for col in snapshot.feature_columns:
+        weather_data.append(float(data.get(col, known_weather.get(col, 0))))
     
     try:
-        result = predictor.predict(weather_data, model_type)
+        result = predictor.predict(weather_data, model_type, snapshot)
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """Score many weather rows (JSON array or CSV upload) with one or more models"""
+    import numpy as np
+    import pandas as pd
+    
+    if not predictor.ensure_models():
+        return jsonify({'error': 'Failed to load models'}), 500
+    
+    snapshot = predictor.snapshot
+    try:
+        if 'file' in request.files:
+            rows = pd.read_csv(request.files['file'])
+            requested = request.form.get('models', predictor.default_model)
+            model_types = [m.strip() for m in requested.split(',') if m.strip()]
+        else:
+            data = request.get_json()
+            if isinstance(data, list):
+                data = {'rows': data}
+            json_rows = data.get('rows', [])
+            if any(isinstance(row, list) for row in json_rows):
+                # Positional rows hold the features in feature_columns order
+                width = len(snapshot.feature_columns)
+                wrong = [i for i, row in enumerate(json_rows) if not isinstance(row, list) or len(row) != width]
+                if wrong:
+                    return jsonify({'error': f'Rows given as arrays need exactly {width} values '
+                                             f'({", ".join(snapshot.feature_columns)})',
+                                    'rows': wrong}), 400
+                rows = pd.DataFrame(json_rows, columns=snapshot.feature_columns)
+            else:
+                rows = pd.DataFrame(json_rows)
+            model_types = data.get('models', [predictor.default_model])
+            if isinstance(model_types, str):
+                model_types = [model_types]
+        
+        if rows.empty:
+            return jsonify({'error': 'No rows to score'}), 400
+        
+        given = rows.reindex(columns=snapshot.feature_columns)
+        features = given.apply(pd.to_numeric, errors='coerce')
+        # Values that were given but are not numbers are errors, not missing features
+        invalid = features.isna() & given.notna()
+        if invalid.to_numpy().any():
+            return jsonify({'error': 'Feature values must be numbers', 'invalid': {
+                int(i): [col for col in snapshot.feature_columns if invalid.at[index, col]]
+                for i, index in enumerate(invalid.index) if invalid.loc[index].any()
+            }}), 400
+        
+        if 'location' in rows.columns and 'date' in rows.columns:
+            # Fill missing features from the recorded weather in one bulk lookup
+            lookup = rows['location'].notna() & rows['date'].notna()
+            try:
+                recorded = predictor.weather_features(rows['location'], rows['date'], snapshot.feature_columns)
+            except RuntimeError as e:
+                return jsonify({'error': str(e)}), 500
+            # Like the single endpoint, a location and date without weather is not found
+            unknown = lookup.to_numpy() & np.isnan(recorded).all(axis=1)
+            if unknown.any():
+                return jsonify({'error': 'No weather recorded for some locations and dates',
+                                'rows': np.flatnonzero(unknown).tolist()}), 404
+            features = features.fillna(pd.DataFrame(recorded, columns=snapshot.feature_columns, index=features.index))
+        
+        # Missing features default to 0, like the single prediction endpoint
+        features = features.fillna(0)
+        results = predictor.predict_many(features, model_types, snapshot)
+        return jsonify({'count': int(len(features)), 'results': results})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+_forecast_service = None
+_forecast_lock = threading.Lock()
+
+def forecast_service():
+    """
+    The forecast service of this process, started on first use
+    
+    Started lazily because threads do not survive a fork. Under gunicorn
+    every worker checks for new runs, but only one fetches and scores each
+    run; the others load its result from the artifact directory.
+    """
+    global _forecast_service
+    with _forecast_lock:
+        if _forecast_service is None:
+            import forecast
+            _forecast_service = forecast.ForecastService(predictor, forecast.make_source(),
+                                                         store_dir=model_store.ARTIFACT_DIR).start()
+        return _forecast_service
+
+@app.route('/api/forecast')
+def get_forecast():
+    """Danger probability per Area and day from the latest weather forecast"""
+    if not predictor.ensure_models():
+        return jsonify({'error': 'Failed to load models'}), 500
+    
+    service = forecast_service()
+    days = request.args.get('days', service.days, type=int)
+    if not 1 <= days <= service.days:
+        return jsonify({'error': f'days must be between 1 and {service.days}'}), 400
+    model_type = request.args.get('model', predictor.default_model)
+    
+    try:
+        entry = service.response(model_type, days)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if entry is None:
+        # The first forecast run is still being fetched in the background
+        response = jsonify({'status': 'loading'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    
+    response = app.response_class(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 @app.route('/api/correlation')
 def get_correlation():
     """Get correlation matrix for weather features"""
-    if predictor.data is None:
-        if not predictor.load_data():
-            return jsonify({'error': 'Failed to load data'}), 500
-    
-    # Calculate correlation matrix
-    corr_data = predictor.data[predictor.feature_columns + ['Dangerous']].corr()
-    
-    return jsonify(corr_data.to_dict())
+    return cached_json('correlation', build_correlation)
 
 def main():
     """Main entry point for the application"""
-    # Load data and train models on startup
-    if predictor.load_data():
-        predictor.train_models()
-        print("Models trained successfully!")
+    # Development server only, production runs under gunicorn (see gunicorn.conf.py)
+    debug = os.environ.get('FLASK_DEBUG', '1').lower() in ('1', 'true', 'yes')
+    port = int(os.environ.get('PORT', 5000))
+    
+    # Load data and models in the background while the server starts. With the
+    # reloader only the child process that actually serves requests does this.
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_init()
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=debug, host='0.0.0.0', port=port, threaded=True)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Startup import-time benchmark for app.py.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter, reports
+the slowest modules and fails when the cumulative import time of `app`
+exceeds the budget or a module that should load lazily is imported eagerly.
+
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget-ms 400 --runs 5
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy packages that must only load on the code paths that need them
+LAZY_MODULES = ['pandas', 'numpy', 'sklearn', 'plotly', 'folium']
+
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def measure(module='app'):
+    """
+    Import a module in a fresh interpreter
+
+    Returns:
+        list: (name, self_us, cumulative_us, depth) for every imported module
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the import time of app.py against a budget')
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('IMPORT_BUDGET_MS', 500)),
+                        help='Maximum cumulative import time (default: $IMPORT_BUDGET_MS or 500)')
+    parser.add_argument('--runs', type=int, default=3, help='Take the best of this many runs')
+    parser.add_argument('--top', type=int, default=10, help='Slowest modules to list')
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    totals = [next(cumulative for name, _, cumulative, _ in run if name == args.module) for run in runs]
+    best = runs[totals.index(min(totals))]
+    total_ms = min(totals) / 1000
+
+    print(f"import {args.module}: {total_ms:.1f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print("\nSlowest modules by self time:")
+    for name, self_us, cumulative_us, _ in sorted(best, key=lambda row: row[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+
+    imported = {name.split('.')[0] for name, _, _, _ in best}
+    eager = [module for module in LAZY_MODULES if module in imported]
+
+    failed = False
+    if eager:
+        print(f"\nFAIL: imported at startup but should load lazily: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"\nFAIL: import time {total_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("\nOK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
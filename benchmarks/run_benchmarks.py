@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for data loading, the models and the API.
+
+Times, at each scale of allData.csv (1x is the bundled file, 10x and 100x are
+synthetic copies with jittered weather):
+
+  - load_data
+  - train_models, and the fit of each model on its own
+  - single-row and batch predict latency of each model
+  - every dashboard endpoint through the Flask test client, cold (response
+    built) and warm (served from the response cache)
+
+Results are written as JSON and compared against a stored baseline; the
+script exits non-zero when a timing is more than --tolerance times slower.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scales 1,10 --save-baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DATA_FILE = os.path.join(ROOT, 'allData.csv')
+BASELINE_FILE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+RESULTS_FILE = os.path.join(ROOT, 'benchmarks', 'results.json')
+
+CACHED_ENDPOINTS = ['/api/data', '/api/locations', '/api/weather_stats', '/api/correlation']
+BATCH_ROWS = 1000
+
+# Timings below this are mostly noise and are not compared
+MIN_COMPARE_SECONDS = 0.001
+
+
+def timed(fn, repeat=1):
+    """Best wall time of `repeat` calls, in seconds, the least noisy estimate"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def scaled_copy(source, factor, directory, seed=0):
+    """
+    Write `factor` copies of a dataset with small noise on the weather columns
+
+    The noise keeps the copies from being exact duplicates, which would make
+    model fitting unrealistically easy.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from app import AvalanchePredictor
+
+    path = os.path.join(directory, f'allData_{factor}x.csv')
+    data = pd.read_csv(source)
+    scaled = pd.concat([data] * factor, ignore_index=True)
+
+    features = [col for col in AvalanchePredictor().feature_columns if col in scaled.columns]
+    numeric = scaled[features].apply(pd.to_numeric, errors='coerce')
+    rng = np.random.default_rng(seed)
+    noise = rng.normal(0, 0.01, size=numeric.shape) * numeric.std().to_numpy()
+    scaled[features] = numeric + noise
+    # The first copy stays identical to the original
+    scaled.loc[:len(data) - 1, features] = numeric.iloc[:len(data)]
+
+    scaled.to_csv(path, index=False)
+    return path
+
+
+def bench_models(predictor, repeat):
+    """Fit and predict timings for each model on the predictor's data"""
+    import numpy as np
+    from sklearn.base import clone
+    from sklearn.model_selection import train_test_split
+
+    results = {'train_models': timed(predictor.train_models)}
+
+    X = predictor.scaler.transform(predictor.data[predictor.feature_columns].to_numpy())
+    y = predictor.data['Dangerous'].to_numpy()
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.25, random_state=42)
+
+    rng = np.random.default_rng(0)
+    raw = predictor.data[predictor.feature_columns].to_numpy()
+    single = raw[0].tolist()
+    batch = raw[rng.integers(0, len(raw), BATCH_ROWS)]
+
+    for name, model in predictor.models.items():
+        results[f'fit_{name}'] = timed(lambda: clone(model).fit(X_train, y_train))
+        results[f'predict_single_{name}'] = timed(lambda: predictor.predict(single, name), repeat * 20)
+        results[f'predict_batch{BATCH_ROWS}_{name}'] = timed(lambda: predictor.predict_many(batch, (name,)), repeat)
+    return results
+
+
+def bench_endpoints(client, repeat):
+    """Latency of each dashboard endpoint through the Flask test client"""
+    from app import response_cache
+
+    results = {}
+    def cold(path):
+        response_cache.clear()
+        return client.get(path)
+
+    for path in CACHED_ENDPOINTS:
+        results[f'GET {path} cold'] = timed(lambda: cold(path), repeat)
+        results[f'GET {path} warm'] = timed(lambda: client.get(path), repeat * 10)
+
+    body = {'model': 'mlp', 'maxtempC': 0, 'mintempC': -10, 'totalSnow_cm': 30, 'tempC': -5}
+    results['POST /api/predict'] = timed(lambda: client.post('/api/predict', json=body), repeat * 10)
+
+    rows = [dict(body, tempC=t) for t in range(-20, 20)] * 25
+    batch = {'rows': rows, 'models': ['mlp', 'logistic', 'hac']}
+    results[f'POST /api/predict/batch {len(rows)}'] = timed(
+        lambda: client.post('/api/predict/batch', json=batch), repeat)
+    return results
+
+
+def run_scale(path, repeat):
+    """All benchmarks against one dataset file"""
+    from app import app, predictor, response_cache
+
+    results = {'rows': None, 'load_data': timed(lambda: predictor.load_data(path), repeat)}
+    results['rows'] = len(predictor.data)
+    results.update(bench_models(predictor, repeat))
+
+    response_cache.clear()
+    results.update(bench_endpoints(app.test_client(), repeat))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print timings next to the baseline
+
+    Returns:
+        list: (scale, metric, ratio) for every timing slower than `tolerance` x baseline
+    """
+    regressions = []
+    for scale, metrics in results['scales'].items():
+        base_metrics = baseline.get('scales', {}).get(scale)
+        if base_metrics is None:
+            print(f"\n{scale}: not in baseline")
+            continue
+        print(f"\n{scale}:")
+        for metric, seconds in metrics.items():
+            base = base_metrics.get(metric)
+            if metric == 'rows' or base is None:
+                continue
+            ratio = seconds / base if base else float('inf')
+            flag = ''
+            if max(seconds, base) >= MIN_COMPARE_SECONDS and ratio > tolerance:
+                regressions.append((scale, metric, ratio))
+                flag = '  REGRESSION'
+            print(f"  {metric:40s} {seconds * 1000:10.2f} ms  baseline {base * 1000:10.2f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark data loading, models and API endpoints')
+    parser.add_argument('--scales', default='1,10,100', help='Comma-separated multiples of allData.csv')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions per timing, the best is kept')
+    parser.add_argument('--output', default=RESULTS_FILE, help='Where to write the results JSON')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='Baseline results to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='Flag timings slower than this multiple of the baseline')
+    args = parser.parse_args(argv)
+
+    import sklearn
+
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sklearn': sklearn.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'scales': {},
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        for factor in [int(scale) for scale in args.scales.split(',')]:
+            path = DATA_FILE if factor == 1 else scaled_copy(DATA_FILE, factor, directory)
+            print(f"Benchmarking {factor}x ({path})...")
+            results['scales'][f'{factor}x'] = run_scale(path, args.repeat)
+
+    with open(args.output, 'w') as outfile:
+        json.dump(results, outfile, indent=2)
+    print(f"Saved results to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as outfile:
+            json.dump(results, outfile, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline) as infile:
+        baseline = json.load(infile)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nFAIL: {len(regressions)} timings more than {args.tolerance}x slower than the baseline")
+        return 1
+    print("\nOK")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
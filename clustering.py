@@ -0,0 +1,81 @@
+"""
+Bounded-memory hierarchical clustering that can score new points.
+
+AgglomerativeClustering needs the full pairwise distance structure, so its
+memory grows with the square of the number of rows, and it cannot assign
+points it was not fitted on. CentroidClusterer runs it on a random sample of
+at most `max_samples` rows and keeps only the centroid of each cluster. Every
+row, including new ones, goes to its nearest centroid, which costs O(k) per
+row. When labels are given, each cluster's danger rate is its probability.
+"""
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.cluster import AgglomerativeClustering
+
+
+class CentroidClusterer(ClassifierMixin, BaseEstimator):
+    def __init__(self, n_clusters=2, max_samples=5000, linkage='ward', random_state=42):
+        """
+        Args:
+            n_clusters (int): Number of clusters
+            max_samples (int): Most rows given to AgglomerativeClustering
+            linkage (str): Linkage criterion for AgglomerativeClustering
+            random_state (int): Seed for the sample
+        """
+        self.n_clusters = n_clusters
+        self.max_samples = max_samples
+        self.linkage = linkage
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        """
+        Cluster a sample of X and, given labels, learn each cluster's danger rate
+
+        Args:
+            X (np.ndarray): Scaled feature rows
+            y (np.ndarray): Optional boolean labels
+        """
+        X = np.asarray(X, dtype=np.float64)
+        sample = X
+        if len(X) > self.max_samples:
+            rng = np.random.default_rng(self.random_state)
+            sample = X[rng.choice(len(X), self.max_samples, replace=False)]
+
+        clusters = AgglomerativeClustering(n_clusters=self.n_clusters, linkage=self.linkage).fit_predict(sample)
+        self.cluster_centers_ = np.vstack([sample[clusters == k].mean(axis=0) for k in range(self.n_clusters)])
+
+        if y is None:
+            self.classes_ = np.arange(self.n_clusters)
+            self.cluster_danger_ = None
+            return self
+
+        # Rates come from every row, not just the sample
+        y = np.asarray(y).astype(bool)
+        assigned = self.assign(X)
+        counts = np.bincount(assigned, minlength=self.n_clusters)
+        dangerous = np.bincount(assigned, weights=y, minlength=self.n_clusters)
+        # An empty cluster falls back to the overall rate
+        self.cluster_danger_ = np.where(counts > 0, dangerous / np.maximum(counts, 1), y.mean())
+        self.classes_ = np.array([False, True])
+        return self
+
+    def assign(self, X):
+        """Index of the nearest centroid for each row"""
+        X = np.asarray(X, dtype=np.float64)
+        # |x - c|^2 without the |x|^2 term, which is the same for every centroid
+        distances = (self.cluster_centers_ ** 2).sum(axis=1) - 2 * X @ self.cluster_centers_.T
+        return distances.argmin(axis=1)
+
+    def predict_proba(self, X):
+        """[P(safe), P(dangerous)] per row, the danger rate of the row's cluster"""
+        if self.cluster_danger_ is None:
+            raise AttributeError('Fitted without labels, only cluster assignment is available')
+        danger = self.cluster_danger_[self.assign(X)]
+        return np.column_stack([1 - danger, danger])
+
+    def predict(self, X):
+        """Majority label of each row's cluster, or the cluster index if fitted without labels"""
+        if self.cluster_danger_ is None:
+            return self.assign(X)
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Columnar (Parquet/Feather) storage for the avalanche and weather datasets.
+
+CSV stays the import/export format. The columnar copy has a fixed schema:
+typed dates, a boolean Dangerous column, categorical Area/Region, and
+numbers parsed once. Readers can ask for just the columns they need.
+Requires pyarrow (`pip install pyarrow`).
+"""
+
+import argparse
+import csv
+import os
+
+import pandas as pd
+
+# Unnamed index column written by earlier pandas exports, pandas reads a
+# blank header cell back as 'Unnamed: 0'
+INDEX_COLUMN = 'Unnamed: 0'
+CATEGORICAL_COLUMNS = ['Area', 'Region']
+TIME_COLUMNS = ['moonrise', 'moonset', 'sunrise', 'sunset']
+# Coordinates identify locations, float32 would merge nearby ones. Depths
+# are recorded with more digits than float32 keeps.
+FULL_PRECISION_COLUMNS = ['latitude', 'longitude', 'Depth']
+FORMATS = {'.parquet': 'parquet', '.feather': 'feather'}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Columnar storage needs pyarrow, install it with `pip install pyarrow`")
+
+
+def store_format(path):
+    """Return 'parquet' or 'feather' for a store path, None for anything else"""
+    return FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def is_store(path):
+    return store_format(path) is not None
+
+
+def text_category(series):
+    """
+    Categorical of a column's values as text, missing values stay missing
+
+    Numeric ids like the Area 10420 become '10420', as they are everywhere else.
+    """
+    if pd.api.types.is_float_dtype(series) and (series.dropna() % 1 == 0).all():
+        # Integer ids read as floats because of a missing value
+        series = series.astype('Int64')
+    categorical = series.astype('category')
+    if not pd.api.types.is_string_dtype(categorical.cat.categories):
+        categorical = categorical.cat.rename_categories(str)
+    return categorical
+
+
+def apply_schema(frame):
+    """Convert a dataset read from CSV to the canonical column types"""
+    frame = frame.copy()
+
+    if 'Date' in frame.columns:
+        frame['Date'] = pd.to_datetime(frame['Date'], format='mixed', errors='coerce')
+
+    if 'Dangerous' in frame.columns and frame['Dangerous'].dtype != bool:
+        dangerous = frame['Dangerous'].astype(str).str.upper().map({'TRUE': True, 'FALSE': False})
+        frame['Dangerous'] = dangerous.fillna(False).astype(bool)
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in frame.columns:
+            frame[col] = frame[col].astype('category')
+
+    # Location is an integer id in the weather data but mixed with names in allData
+    if 'Location' in frame.columns and not pd.api.types.is_integer_dtype(frame['Location']):
+        frame['Location'] = text_category(frame['Location'])
+
+    for col in TIME_COLUMNS:
+        if col in frame.columns:
+            frame[col] = frame[col].astype('string')
+
+    return frame
+
+
+def compact_frame(frame, full_precision=FULL_PRECISION_COLUMNS):
+    """
+    Shrink a cleaned dataset in memory, converting its columns in place
+
+    Floats become float32 and integers that fit become int16. Area, Region
+    and Location become categoricals and Dangerous becomes bool. Float
+    columns in full_precision stay float64.
+
+    Returns:
+        pd.DataFrame: The same frame
+    """
+    for col in frame.columns:
+        series = frame[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_float_dtype(series):
+            if col not in full_precision:
+                frame[col] = series.astype('float32')
+        elif pd.api.types.is_integer_dtype(series) and len(series):
+            if -2 ** 15 <= series.min() and series.max() < 2 ** 15:
+                frame[col] = series.astype('int16')
+
+    for col in CATEGORICAL_COLUMNS + ['Location']:
+        if col in frame.columns and not isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = text_category(frame[col])
+
+    if 'Dangerous' in frame.columns:
+        frame['Dangerous'] = frame['Dangerous'].astype(bool)
+    return frame
+
+
+def write_store(frame, path):
+    """Write a schema-typed frame to a Parquet or Feather file"""
+    _require_pyarrow()
+    fmt = store_format(path)
+    if fmt == 'parquet':
+        frame.to_parquet(path, index=False)
+    elif fmt == 'feather':
+        frame.reset_index(drop=True).to_feather(path)
+    else:
+        raise ValueError(f"Unsupported store format: {path}")
+
+
+def store_columns(path):
+    """Column names in a store, read from its schema without loading any data"""
+    _require_pyarrow()
+    if store_format(path) == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    import pyarrow.feather as feather
+    return feather.read_table(path, memory_map=True).schema.names
+
+
+def read_store(path, columns=None):
+    """
+    Read a columnar store
+
+    Args:
+        path (str): .parquet or .feather file
+        columns (list): Columns to read, None for all. Columns missing from
+            the store are ignored.
+    """
+    _require_pyarrow()
+    if columns is not None:
+        available = set(store_columns(path))
+        columns = [col for col in columns if col in available]
+
+    if store_format(path) == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_feather(path, columns=columns)
+
+
+def import_csv(csv_path, store_path=None):
+    """Convert a CSV dataset to a columnar store next to it, returning the store path"""
+    store_path = store_path or os.path.splitext(csv_path)[0] + '.parquet'
+    frame = apply_schema(pd.read_csv(csv_path))
+    with open(csv_path, newline='') as infile:
+        if next(csv.reader(infile))[0] == '':
+            # Keep the blank header so exports reproduce it
+            frame = frame.rename(columns={INDEX_COLUMN: ''})
+    write_store(frame, store_path)
+    print(f"Wrote {len(frame)} rows from {csv_path} to {store_path}")
+    return store_path
+
+
+def export_csv(store_path, csv_path, date_format='%m/%d/%Y'):
+    """Write a columnar store back out as CSV"""
+    frame = read_store(store_path)
+    if 'Date' in frame.columns:
+        if date_format == '%m/%d/%Y':
+            # Match the unpadded M/D/YYYY dates used by allData.csv
+            dates = frame['Date'].dt
+            frame['Date'] = (dates.month.astype(str) + '/' + dates.day.astype(str)
+                             + '/' + dates.year.astype(str))
+        else:
+            frame['Date'] = frame['Date'].dt.strftime(date_format)
+    frame.to_csv(csv_path, index=False)
+    print(f"Wrote {len(frame)} rows from {store_path} to {csv_path}")
+    return csv_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert datasets between CSV and columnar storage')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='CSV -> Parquet/Feather')
+    import_parser.add_argument('csv_path')
+    import_parser.add_argument('store_path', nargs='?', help='Defaults to the CSV name with .parquet')
+
+    export_parser = subparsers.add_parser('export', help='Parquet/Feather -> CSV')
+    export_parser.add_argument('store_path')
+    export_parser.add_argument('csv_path')
+    export_parser.add_argument('--date-format', default='%m/%d/%Y',
+                               help='strftime format for the Date column (all_weather_data.csv uses %%Y-%%m-%%d)')
+
+    args = parser.parse_args(argv)
+    if args.command == 'import':
+        import_csv(args.csv_path, args.store_path)
+    else:
+        export_csv(args.store_path, args.csv_path, args.date_format)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
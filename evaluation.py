@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Cross-validated comparison of the AvalanchePredictor models.
+
+Every model in app.MODEL_FACTORIES is scored with the same stratified
+k-fold split. Each fold is scaled once and the scaled folds are shared by
+all models. The (model, fold) fits run in parallel across cores with joblib.
+The report has accuracy, ROC-AUC and fit/predict timings per model. It also
+names the best model, which the app then serves by default.
+
+    python evaluation.py
+    python evaluation.py --folds 10 --metric accuracy
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+EVALUATION_FILE = os.environ.get('MODEL_EVALUATION_FILE', os.path.join('data', 'model_evaluation.json'))
+METRICS = ('roc_auc', 'accuracy')
+
+
+def make_folds(X, y, n_splits=5, random_state=42):
+    """
+    Stratified folds, each scaled with a scaler fitted on its training part
+
+    Returns:
+        list: (X_train, X_test, y_train, y_test) per fold
+    """
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.preprocessing import StandardScaler
+
+    folds = []
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    for train, test in splitter.split(X, y):
+        scaler = StandardScaler().fit(X[train])
+        folds.append((scaler.transform(X[train]), scaler.transform(X[test]), y[train], y[test]))
+    return folds
+
+
+def evaluate_fold(name, fold):
+    """Fit one model on one fold and score it on the held-out part"""
+    import numpy as np
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    from app import MODEL_FACTORIES
+
+    X_train, X_test, y_train, y_test = fold
+    model = MODEL_FACTORIES[name]()
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    probabilities = model.predict_proba(X_test)
+    predict_seconds = time.perf_counter() - start
+
+    labels = model.classes_[probabilities.argmax(axis=1)]
+    dangerous = probabilities[:, list(model.classes_).index(True)]
+    return {
+        'accuracy': float(accuracy_score(y_test, labels)),
+        'roc_auc': float(roc_auc_score(y_test, dangerous)) if len(np.unique(y_test)) > 1 else float('nan'),
+        'fit_seconds': fit_seconds,
+        'predict_ms_per_1k': predict_seconds / len(X_test) * 1e6,
+    }
+
+
+def cross_validate(X, y, model_names, n_splits=5, n_jobs=-1, random_state=42):
+    """
+    Score every model on the same folds, fitting (model, fold) pairs in parallel
+
+    Returns:
+        dict: Model name -> mean and std of each measurement over the folds
+    """
+    import numpy as np
+    from joblib import Parallel, delayed
+
+    folds = make_folds(X, y, n_splits, random_state)
+    # joblib memory-maps the large fold arrays, so workers share one copy
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_fold)(name, fold) for name in model_names for fold in folds
+    )
+
+    results = {}
+    for i, name in enumerate(model_names):
+        model_scores = scores[i * n_splits:(i + 1) * n_splits]
+        results[name] = {
+            key: {
+                'mean': float(np.mean([score[key] for score in model_scores])),
+                'std': float(np.std([score[key] for score in model_scores])),
+            }
+            for key in model_scores[0]
+        }
+    return results
+
+
+def best_model(results, metric='roc_auc'):
+    """Name of the model with the highest mean score"""
+    return max(results, key=lambda name: results[name][metric]['mean'])
+
+
+def load_evaluation(path=EVALUATION_FILE):
+    """The last saved evaluation report, None if there is none"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as infile:
+            return json.load(infile)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable model evaluation {path}: {e}")
+        return None
+
+
+def selected_model(default='mlp', path=EVALUATION_FILE):
+    """
+    Model to serve when a request does not name one
+
+    DEFAULT_MODEL wins, then the best model of the last evaluation, then `default`
+    """
+    if os.environ.get('DEFAULT_MODEL'):
+        return os.environ['DEFAULT_MODEL']
+    report = load_evaluation(path)
+    return report['best'] if report and report.get('best') else default
+
+
+def print_report(results, metric):
+    print(f"\n{'model':10s} {'roc_auc':>15s} {'accuracy':>15s} {'fit s':>10s} {'predict ms/1k':>14s}")
+    for name in sorted(results, key=lambda name: results[name][metric]['mean'], reverse=True):
+        scores = results[name]
+        print(f"{name:10s} "
+              f"{scores['roc_auc']['mean']:8.3f} ±{scores['roc_auc']['std']:.3f} "
+              f"{scores['accuracy']['mean']:8.3f} ±{scores['accuracy']['std']:.3f} "
+              f"{scores['fit_seconds']['mean']:10.3f} "
+              f"{scores['predict_ms_per_1k']['mean']:14.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cross-validate the avalanche models and pick the default')
+    parser.add_argument('--data', default=None,
+                        help='Training data file (default: DATA_FILE, the file the app serves)')
+    parser.add_argument('--folds', type=int, default=5, help='Stratified folds')
+    parser.add_argument('--models', default=None, help='Comma-separated models (default: all)')
+    parser.add_argument('--metric', choices=METRICS, default='roc_auc', help='Score used to pick the default model')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel fits (default: all cores)')
+    parser.add_argument('--output', default=EVALUATION_FILE, help='Where to write the report')
+    args = parser.parse_args(argv)
+
+    from app import AvalanchePredictor, DATA_FILE, MODEL_FACTORIES
+
+    args.data = args.data or DATA_FILE
+
+    predictor = AvalanchePredictor()
+    if not predictor.load_data(args.data):
+        return 1
+
+    model_names = args.models.split(',') if args.models else list(MODEL_FACTORIES)
+    unknown = [name for name in model_names if name not in MODEL_FACTORIES]
+    if unknown:
+        print(f"Unknown model(s): {', '.join(unknown)}")
+        return 1
+
+    X = predictor.data[predictor.feature_columns].to_numpy(dtype=float)
+    y = predictor.data['Dangerous'].to_numpy(dtype=bool)
+
+    print(f"Cross-validating {', '.join(model_names)} on {len(X)} rows with {args.folds} folds...")
+    start = time.perf_counter()
+    results = cross_validate(X, y, model_names, args.folds, args.jobs)
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+    print_report(results, args.metric)
+    best = best_model(results, args.metric)
+    print(f"\nBest model by {args.metric}: {best}")
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'data_file': args.data,
+        'data_hash': predictor.data_hash,
+        'folds': args.folds,
+        'metric': args.metric,
+        'best': best,
+        'models': results,
+    }
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as outfile:
+        json.dump(report, outfile, indent=2)
+    print(f"Saved evaluation to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,353 @@
+"""
+Danger forecast for every known Area over the next few days.
+
+A forecast source returns daily weather features for a list of locations.
+ForecastService scores every (Area, day) pair with one predict_many call per
+model and keeps the result as an Area x day matrix per forecast run. A
+background thread refreshes it when the source publishes a new run or new
+models are swapped in, so requests only read the stored matrix.
+
+With a store directory, the processes of a server share one forecast. The
+process holding forecast.lock there fetches and scores each run once and
+saves it as JSON, keyed by run, data hash and model version. The others load
+that file, so every worker serves the same forecast and ETag.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+import metrics
+from response_cache import ResponseCache
+
+FORECAST_SOURCE = os.environ.get('FORECAST_SOURCE', 'open-meteo')
+FORECAST_DAYS = int(os.environ.get('FORECAST_DAYS', '3'))
+FORECAST_REFRESH_SECONDS = float(os.environ.get('FORECAST_REFRESH_SECONDS', '900'))
+# Seconds between looks for the shared file while another process scores a run
+FORECAST_RETRY_SECONDS = float(os.environ.get('FORECAST_RETRY_SECONDS', '5'))
+LOCK_FILE = 'forecast.lock'
+
+
+class OpenMeteoForecastSource:
+    """Daily forecasts from the Open-Meteo forecast API, many locations per request"""
+
+    # Open-Meteo daily variable -> feature column
+    DAILY_VARIABLES = {
+        'temperature_2m_max': 'maxtempC',
+        'temperature_2m_min': 'mintempC',
+        'snowfall_sum': 'totalSnow_cm',
+        'wind_speed_10m_max': 'windspeedKmph',
+        'wind_direction_10m_dominant': 'winddirDegree',
+        'precipitation_sum': 'precipMM',
+        'relative_humidity_2m_mean': 'humidity',
+    }
+
+    def __init__(self, base_url=None, batch_size=100, update_hours=1, timeout=30):
+        """
+        Args:
+            base_url (str): Forecast API URL, override to point at a local stub server
+            batch_size (int): Locations per request
+            update_hours (int): How often a new forecast run is fetched
+            timeout (float): Request timeout in seconds
+        """
+        self.base_url = base_url or os.environ.get(
+            'OPEN_METEO_FORECAST_URL', 'https://api.open-meteo.com/v1/forecast')
+        self.batch_size = batch_size
+        self.update_hours = update_hours
+        self.timeout = timeout
+
+    def run_id(self):
+        """The forecast run that is current now, one per update_hours"""
+        now = datetime.now(timezone.utc)
+        return now.replace(hour=now.hour - now.hour % self.update_hours, minute=0, second=0,
+                           microsecond=0).isoformat(timespec='minutes')
+
+    def fetch(self, locations, days):
+        """
+        Forecast weather for each location
+
+        Args:
+            locations (pd.DataFrame): Area, latitude and longitude per location
+            days (int): Days to forecast, starting today
+
+        Returns:
+            pd.DataFrame: Area, date and the feature columns, one row per location and day
+        """
+        import pandas as pd
+        import requests
+
+        frames = []
+        for start in range(0, len(locations), self.batch_size):
+            batch = locations.iloc[start:start + self.batch_size]
+            params = {
+                'latitude': ','.join(f'{value:.6f}' for value in batch['latitude']),
+                'longitude': ','.join(f'{value:.6f}' for value in batch['longitude']),
+                'daily': ','.join(self.DAILY_VARIABLES),
+                'forecast_days': days,
+                'timezone': 'auto',
+            }
+            response = requests.get(self.base_url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            results = response.json()
+            # A single location comes back as an object, several as a list
+            if isinstance(results, dict):
+                results = [results]
+            for area, result in zip(batch['Area'], results):
+                daily = result.get('daily', {})
+                frame = pd.DataFrame({'date': daily.get('time', [])})
+                for variable, column in self.DAILY_VARIABLES.items():
+                    frame[column] = daily.get(variable)
+                # Like the archive fetcher, the day's maximum stands in for tempC
+                frame['tempC'] = frame['maxtempC']
+                frame.insert(0, 'Area', area)
+                frames.append(frame)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Area', 'date'])
+
+
+class FixtureForecastSource:
+    """Forecast read from a local CSV with Area, date and feature columns, for offline use"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def run_id(self):
+        # A new run whenever the file changes
+        stat = os.stat(self.path)
+        return f'{os.path.basename(self.path)}@{stat.st_mtime_ns}'
+
+    def fetch(self, locations, days):
+        import pandas as pd
+
+        # Area names like 10420 must stay text to match the dataset
+        forecast = pd.read_csv(self.path, dtype={'Area': str, 'date': str})
+        forecast = forecast[forecast['Area'].isin(locations['Area'])]
+        # The first `days` dates of the fixture stand for today and the following days
+        dates = sorted(forecast['date'].unique())[:days]
+        return forecast[forecast['date'].isin(dates)]
+
+
+def make_source(spec=FORECAST_SOURCE):
+    """'open-meteo' or the path of a fixture CSV"""
+    if spec == 'open-meteo':
+        return OpenMeteoForecastSource()
+    return FixtureForecastSource(spec)
+
+
+def area_locations(data):
+    """One (Area, latitude, longitude) row per Area in the dataset"""
+    return (data.groupby('Area', observed=True, sort=True)[['latitude', 'longitude']]
+            .first().dropna().reset_index())
+
+
+class ForecastService:
+    def __init__(self, predictor, source, days=FORECAST_DAYS, refresh_seconds=FORECAST_REFRESH_SECONDS,
+                 store_dir=None, retry_seconds=FORECAST_RETRY_SECONDS):
+        """
+        Args:
+            predictor (AvalanchePredictor): Predictor whose snapshot is scored
+            source: Forecast source with run_id() and fetch(locations, days)
+            days (int): Days forecast per refresh, the most a request can ask for
+            refresh_seconds (float): Seconds between checks for a new run
+            store_dir (str): Directory to share forecasts with other processes in, None to score
+                every run in this process
+            retry_seconds (float): Seconds between looks for a run another process is scoring
+        """
+        self.predictor = predictor
+        self.source = source
+        self.days = days
+        self.refresh_seconds = refresh_seconds
+        self.store_dir = store_dir
+        self.retry_seconds = retry_seconds
+        self.forecast = None
+        self.responses = ResponseCache()
+        self._key = None
+        self._pending = False
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def store_path(self, key):
+        """Shared file of the forecast for a (run, data hash, model version) key"""
+        digest = hashlib.sha256('|'.join(str(part) for part in key).encode('utf-8')).hexdigest()
+        return os.path.join(self.store_dir, f'forecast-{digest[:16]}.json')
+
+    def _is_scorer(self):
+        """True if this process scores the runs, holding forecast.lock once it has it"""
+        if self._lock_file is not None:
+            return True
+        import fcntl
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        lock_file = open(os.path.join(self.store_dir, LOCK_FILE), 'a')
+        try:
+            # Released by the OS when this process exits, another one takes over
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _load(self, path):
+        import numpy as np
+
+        try:
+            with open(path) as infile:
+                forecast = json.load(infile)
+        except (OSError, ValueError):
+            return None
+        forecast['danger'] = {model_type: np.array(rows, dtype=float)
+                              for model_type, rows in forecast['danger'].items()}
+        return forecast
+
+    def _save(self, path, forecast):
+        stored = dict(forecast, danger={
+            model_type: [[None if value != value else float(value) for value in row] for row in matrix]
+            for model_type, matrix in forecast['danger'].items()
+        })
+        with open(f'{path}.tmp', 'w') as outfile:
+            json.dump(stored, outfile)
+        os.replace(f'{path}.tmp', path)
+        # Every process has moved on from the older runs or will skip them
+        for name in os.listdir(self.store_dir):
+            if name.startswith('forecast-') and name.endswith('.json') and name != os.path.basename(path):
+                os.remove(os.path.join(self.store_dir, name))
+
+    def refresh(self):
+        """
+        Take up the current forecast run unless it is already stored with the current models
+
+        Returns:
+            bool: True if a new forecast was stored
+        """
+        snapshot = self.predictor.snapshot
+        if not snapshot.ready:
+            return False
+        run = self.source.run_id()
+        key = (run, snapshot.data_hash, snapshot.version)
+        if key == self._key:
+            return False
+
+        forecast = None
+        if self.store_dir is not None:
+            path = self.store_path(key)
+            forecast = self._load(path)
+            if forecast is None and not self._is_scorer():
+                # Another process is scoring this run, look again soon
+                self._pending = True
+                return False
+        if forecast is None:
+            forecast = self.score(snapshot, run)
+            if self.store_dir is not None:
+                self._save(path, forecast)
+
+        self.forecast = forecast
+        self._key = key
+        self._pending = False
+        return True
+
+    def score(self, snapshot, run):
+        """
+        Fetch the forecast weather for every Area and score it with every model
+
+        Returns:
+            dict: The forecast, with an Area x day danger matrix per model
+        """
+        import numpy as np
+        import pandas as pd
+
+        with metrics.FORECAST_SECONDS.time():
+            locations = area_locations(snapshot.data)
+            weather = self.source.fetch(locations, self.days)
+            dates = sorted(weather['date'].unique())
+            areas = locations['Area'].tolist()
+
+            # Row (area, day) of the matrix for every forecast row
+            area_index = {area: i for i, area in enumerate(areas)}
+            date_index = {date: i for i, date in enumerate(dates)}
+            rows = weather['Area'].map(area_index).to_numpy()
+            columns = weather['date'].map(date_index).to_numpy()
+            features = (weather.reindex(columns=snapshot.feature_columns)
+                        .apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64))
+            complete = ~np.isnan(features).any(axis=1)
+
+            danger = {}
+            if complete.any():
+                model_types = list(snapshot.models)
+                results = self.predictor.predict_many(features[complete], model_types, snapshot)
+                for model_type, result in results.items():
+                    labels = np.asarray(result['prediction'], dtype=bool)
+                    if result['probability'] is None:
+                        dangerous = labels.astype(float)
+                    else:
+                        # Probability of the predicted class -> probability of danger
+                        probability = np.asarray(result['probability'])
+                        dangerous = np.where(labels, probability, 1 - probability)
+                    matrix = np.full((len(areas), len(dates)), np.nan)
+                    matrix[rows[complete], columns[complete]] = dangerous
+                    danger[model_type] = matrix
+
+        forecast = {
+            'run': run,
+            'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'model_version': snapshot.version,
+            'dates': [str(date) for date in dates],
+            'areas': areas,
+            'latitude': locations['latitude'].round(6).tolist(),
+            'longitude': locations['longitude'].round(6).tolist(),
+            'danger': danger,
+        }
+        print(f"Forecast run {run}: scored {int(complete.sum())} area-days for {len(areas)} areas")
+        return forecast
+
+    def response(self, model_type, days):
+        """
+        Pre-serialized forecast for one model and the first `days` days
+
+        Returns:
+            CachedResponse: None until the first forecast is stored
+        """
+        forecast = self.forecast
+        if forecast is None:
+            return None
+        if model_type not in forecast['danger']:
+            raise ValueError(f"Unknown model: {model_type}")
+
+        def build():
+            matrix = forecast['danger'][model_type][:, :days]
+            return {
+                'run': forecast['run'],
+                'generated_at': forecast['generated_at'],
+                'model': model_type,
+                'model_version': forecast['model_version'],
+                'dates': forecast['dates'][:days],
+                'areas': forecast['areas'],
+                'latitude': forecast['latitude'],
+                'longitude': forecast['longitude'],
+                # One row per area, one column per date, null where weather is missing
+                'danger': [[None if value != value else round(float(value), 3) for value in row]
+                           for row in matrix],
+            }
+
+        version = f"{forecast['run']}:{forecast['generated_at']}"
+        return self.responses.get(f'{model_type}:{days}', version, build)
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing forecast: {e}")
+            if self._stop.wait(self.retry_seconds if self._pending else self.refresh_seconds):
+                return
+
+    def start(self):
+        """Refresh now and then every refresh_seconds in a daemon thread"""
+        self._thread = threading.Thread(target=self._run, name='forecast-refresh', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,117 @@
+"""
+Gunicorn settings for production serving.
+
+The app is preloaded in the master, which loads the data and models once
+before forking, so every worker shares them copy-on-write instead of holding
+its own copy. On SIGHUP (sent by the artifact watcher below and by
+POST /admin/reload) the master swaps in the newest artifact and then
+gracefully replaces the workers with forks that already hold it. In-flight
+requests finish on the old workers and nothing is retrained.
+
+Every process saves its metrics to METRICS_DIR (a fresh temporary directory
+unless set), so /metrics reports the totals of all workers. Workers save
+after a scrape, and the master folds the file of each exited worker into one
+aggregate.
+
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import gc
+import multiprocessing
+import os
+import signal
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+preload_app = True
+
+# Tells wsgi.py to load everything synchronously in the master
+os.environ.setdefault('PRELOAD_MODELS', '1')
+
+ARTIFACT_POLL_SECONDS = float(os.environ.get('ARTIFACT_POLL_SECONDS', '30'))
+# How often workers check whether /metrics was scraped and save their values
+METRICS_POLL_SECONDS = float(os.environ.get('METRICS_POLL_SECONDS', '1'))
+
+# Set before the app and metrics.py are imported. The config is read again on
+# SIGHUP, which must keep the same directory.
+if not os.environ.get('METRICS_DIR'):
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='avalanche-metrics-')
+
+
+def on_starting(server):
+    import metrics
+
+    # Totals from an earlier server would be added to this one's
+    metrics.REGISTRY.clear()
+
+
+def when_ready(server):
+    """Start watching for new model artifacts once the master is up"""
+    import metrics
+
+    # The master loaded the data and models, keep those timings
+    metrics.REGISTRY.write()
+    # Lets POST /admin/reload in a worker ask the master to reload
+    os.environ['GUNICORN_MASTER_PID'] = str(server.pid)
+    if ARTIFACT_POLL_SECONDS <= 0:
+        return
+
+    import model_store
+    from app import artifact_on_disk, model_files
+
+    def on_change():
+        # A data change without its artifact would only replace the workers
+        # with the same models, wait for `python model_store.py` instead
+        if artifact_on_disk() is None:
+            server.log.info("Data changed but has no model artifact yet, keeping the current workers")
+            return
+        # Handled in the master's main loop by on_reload below
+        os.kill(server.pid, signal.SIGHUP)
+
+    model_store.ArtifactWatcher(model_files, on_change, ARTIFACT_POLL_SECONDS).start()
+
+
+def on_reload(server):
+    """Swap in the newest artifact before the replacement workers are forked"""
+    import metrics
+    from app import reload_predictor
+
+    if reload_predictor():
+        server.log.info("New model artifact loaded, replacing workers")
+    else:
+        server.log.info("No new model artifact, replacing workers with the current models")
+    metrics.REGISTRY.write()
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the collector's view. Otherwise
+    # the first collection in each worker touches every object header and
+    # copies the shared pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import metrics
+
+    # The master's values are in its own file, count them only once
+    metrics.REGISTRY.reset()
+    metrics.REGISTRY.start_writing(METRICS_POLL_SECONDS)
+
+
+def worker_exit(server, worker):
+    import metrics
+
+    # Keep the requests served since the last write
+    metrics.REGISTRY.write()
+
+
+def child_exit(server, worker):
+    import metrics
+
+    # Runs in the master once the worker is gone, one worker at a time
+    metrics.REGISTRY.merge_exited(worker.pid)
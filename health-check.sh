@@ -5,7 +5,7 @@ echo "🏔️  Avalanche Forecast Health Check"
 echo "=================================="
 
 # Check if the application is running
-if curl -f http://localhost:5000/api/data > /dev/null 2>&1; then
+if curl -f http://localhost:5000/health > /dev/null 2>&1; then
     echo "✅ Application is healthy and running"
     echo "🌐 Dashboard: http://localhost:5000"
     echo "📊 API: http://localhost:5000/api/data"
@@ -0,0 +1,406 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are plain dicts of numbers behind a lock, so
+recording a value is a dict lookup and a few additions. Nothing is formatted
+until /metrics is scraped.
+
+With METRICS_DIR set (gunicorn.conf.py sets it), every process also saves
+its values to <pid>.json in that directory, and /metrics adds up the files
+of all processes. A scrape then sees the totals of every worker, whichever
+worker answers it. Workers only save after a scrape and when their values
+changed, and the file of an exited worker is folded into dead.json so its
+counts stay in the totals. Gauges are read per process and carry a pid label
+instead.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+# Files in METRICS_DIR besides <pid>.json
+DEAD_FILE = 'dead.json'
+SCRAPE_FILE = 'scraped'
+
+# Seconds, from sub-millisecond model calls to multi-second responses
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds, for loading data and fitting models
+LOAD_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        # Values recorded so far, tells whether anything changed since a save
+        self.updates = 0
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def reset(self):
+        """Forget the values recorded so far"""
+
+    def render(self, states=None):
+        """
+        Args:
+            states (list): (pid, state()) per process, this process alone if None
+        """
+        if states is None:
+            states = [(None, self.state())]
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples(states))
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            self.updates += 1
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def state(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, states):
+        """Add up the states of several processes"""
+        values = {}
+        for state in states:
+            for key, value in state:
+                key = tuple(key)
+                values[key] = values.get(key, 0) + value
+        return [[list(key), value] for key, value in values.items()]
+
+    def _samples(self, states):
+        values = {tuple(key): value for key, value in self.merge([state for _, state in states])}
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Gauge(Metric):
+    """A value read from a callable when metrics are scraped"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, read):
+        super().__init__(name, documentation)
+        self.read = read
+
+    def state(self):
+        return float(self.read())
+
+    def _samples(self, states):
+        for pid, value in sorted(states, key=lambda item: item[0] or 0):
+            labels = _format_labels(('pid',), (pid,)) if pid is not None else ''
+            yield f'{self.name}{labels} {_format_value(value)}'
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, last is +Inf), sum]
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+            self.updates += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of a block, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, **labels):
+        """Decorator observing the wall time of every call"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def state(self):
+        with self._lock:
+            return [[list(key), list(counts), total] for key, (counts, total) in self._values.items()]
+
+    def merge(self, states):
+        """Add up the states of several processes"""
+        values = {}
+        for state in states:
+            for key, counts, total in state:
+                key = tuple(key)
+                if key in values:
+                    summed, summed_total = values[key]
+                    values[key] = ([a + b for a, b in zip(summed, counts)], summed_total + total)
+                else:
+                    values[key] = (list(counts), total)
+        return [[list(key), counts, total] for key, (counts, total) in values.items()]
+
+    def _samples(self, states):
+        values = {tuple(key): (counts, total) for key, counts, total in self.merge([state for _, state in states])}
+        bounds = self.buckets + (float('inf'),)
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registry:
+    def __init__(self, directory=None):
+        """
+        Args:
+            directory (str): Where the processes of one server share their values, None for
+                this process alone
+        """
+        self._metrics = []
+        self.directory = directory
+        self._writer = None
+        # (pid, file id) of the process the id was made for
+        self._process = None
+        # Sum of the metrics' updates at the last save, None before the first
+        self._saved = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def reset(self):
+        """Forget this process's values, e.g. the ones a forked worker inherited"""
+        for metric in self._metrics:
+            metric.reset()
+        self._saved = None
+
+    def clear(self):
+        """Remove the files left by an earlier server"""
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _dump(self, name, content):
+        path = self._path(name)
+        with open(f'{path}.tmp', 'w') as outfile:
+            json.dump(content, outfile)
+        # Readers see the old file or the new one, never a partial write
+        os.replace(f'{path}.tmp', path)
+
+    def _load(self, name):
+        try:
+            with open(self._path(name)) as infile:
+                return json.load(infile)
+        except (OSError, ValueError):
+            return None
+
+    def _file_id(self):
+        """Identifies this process's file, a worker that gets a recycled pid gets a new id"""
+        pid = os.getpid()
+        if self._process is None or self._process[0] != pid:
+            self._process = (pid, f'{pid}-{time.time_ns()}')
+        return self._process[1]
+
+    def _updates(self):
+        return sum(metric.updates for metric in self._metrics)
+
+    def write(self):
+        """Save this process's values to the shared directory"""
+        updates = self._updates()
+        self._dump(f'{os.getpid()}.json', {
+            'id': self._file_id(),
+            'metrics': {metric.name: metric.state() for metric in self._metrics},
+        })
+        self._saved = updates
+
+    def start_writing(self, interval):
+        """
+        Save in a daemon thread after each scrape, if any value changed since the last save
+
+        Between scrapes this costs one stat() of the scrape marker every `interval` seconds.
+        """
+        def run():
+            seen = None
+            while True:
+                time.sleep(interval)
+                try:
+                    scraped = os.stat(self._path(SCRAPE_FILE)).st_mtime_ns
+                    if scraped == seen:
+                        continue
+                    seen = scraped
+                    if self._saved is None or self._updates() != self._saved:
+                        self.write()
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    print(f"Error writing metrics: {e}")
+
+        self._writer = threading.Thread(target=run, name='metrics-writer', daemon=True)
+        self._writer.start()
+
+    def merge_exited(self, pid):
+        """Fold the file of an exited process into dead.json, keeping its counts in the totals"""
+        process = self._load(f'{pid}.json')
+        if process is None:
+            return
+        dead = self._load(DEAD_FILE) or {'merged': [], 'metrics': {}}
+        merged_metrics = {}
+        for metric in self._metrics:
+            if metric.kind == 'gauge':
+                continue
+            states = [source[metric.name] for source in (dead['metrics'], process['metrics'])
+                      if metric.name in source]
+            merged_metrics[metric.name] = metric.merge(states)
+        # Readers skip the files listed here, so nothing is counted twice
+        # until the file is removed. Files that are gone need no entry.
+        merged = [file_id for file_id in dead['merged']
+                  if (self._load(f"{file_id.split('-')[0]}.json") or {}).get('id') == file_id]
+        self._dump(DEAD_FILE, {'merged': merged + [process['id']], 'metrics': merged_metrics})
+        os.remove(self._path(f'{pid}.json'))
+
+    def _read(self):
+        """(pid, metrics) of every process not yet in dead.json, and the metrics of dead.json"""
+        processes = []
+        for name in os.listdir(self.directory):
+            pid = name[:-len('.json')]
+            if name.endswith('.json') and pid.isdigit():
+                process = self._load(name)
+                if process is not None:
+                    processes.append((int(pid), process))
+        # Read last: a file folded in since it was read is listed as merged
+        dead = self._load(DEAD_FILE) or {'merged': [], 'metrics': {}}
+        processes = [(pid, process['metrics']) for pid, process in processes
+                     if process['id'] not in dead['merged']]
+        return processes, dead['metrics']
+
+    def render(self):
+        """All metrics in the Prometheus text format"""
+        if self.directory is None:
+            return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+        self.write()
+        # Tells the other processes to save their values for the next scrape
+        with open(self._path(SCRAPE_FILE), 'a'):
+            os.utime(self._path(SCRAPE_FILE))
+        processes, dead = self._read()
+        live = [(pid, process) for pid, process in processes if _alive(pid)]
+        rendered = []
+        for metric in self._metrics:
+            if metric.kind == 'gauge':
+                states = [(pid, process[metric.name]) for pid, process in live if metric.name in process]
+            else:
+                states = [(pid, process[metric.name]) for pid, process in processes if metric.name in process]
+                if metric.name in dead:
+                    states.append((None, dead[metric.name]))
+            rendered.append(metric.render(states))
+        return '\n'.join(rendered) + '\n'
+
+
+REGISTRY = Registry(METRICS_DIR)
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, read):
+    return REGISTRY.register(Gauge(name, documentation, read))
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+REQUESTS = counter('avalanche_http_requests_total', 'HTTP requests by route and status',
+                   ('method', 'route', 'status'))
+REQUEST_SECONDS = histogram('avalanche_http_request_duration_seconds', 'HTTP request latency by route',
+                            ('method', 'route'))
+MODEL_REQUESTS = counter('avalanche_model_requests_total', 'Scoring calls by model', ('model',))
+MODEL_ROWS = counter('avalanche_model_rows_total', 'Rows scored by model', ('model',))
+MODEL_SECONDS = histogram('avalanche_model_predict_duration_seconds', 'Model scoring latency per call',
+                          ('model',))
+SCALER_SECONDS = histogram('avalanche_scaler_transform_duration_seconds', 'Feature scaling latency per call')
+RESPONSE_BUILD_SECONDS = histogram('avalanche_response_build_duration_seconds',
+                                   'Time to compute a cached dashboard response', ('endpoint',))
+DATA_LOAD_SECONDS = histogram('avalanche_data_load_duration_seconds', 'Time to load and clean the dataset',
+                              buckets=LOAD_BUCKETS)
+MODEL_LOAD_SECONDS = histogram('avalanche_model_load_duration_seconds',
+                               'Time to load models from an artifact or train them', ('source',),
+                               buckets=LOAD_BUCKETS)
+MODEL_RELOADS = counter('avalanche_model_reloads_total', 'Hot model reloads by result', ('result',))
+FORECAST_SECONDS = histogram('avalanche_forecast_refresh_duration_seconds',
+                             'Time to fetch and score a forecast run', buckets=LOAD_BUCKETS)
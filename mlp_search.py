@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Successive-halving search over the production MLP's hyperparameters.
+
+Candidates (layer sizes, alpha, learning rate) start with a small budget of
+training epochs on the shared cross-validation folds from evaluation.py.
+After each round only the best 1/factor of them survive. The survivors keep
+training from their current weights (warm_start) up to the next budget, so
+no epoch is repeated. The winner is then fitted once from scratch on the
+training split of train_models, to check that it converges there within
+PRODUCTION_MAX_ITER epochs. Its parameters go to data/mlp_params.json, which
+train_models uses for the production MLP.
+
+    python mlp_search.py
+    python mlp_search.py --candidates 36 --min-iter 20 --max-iter 540
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+import warnings
+from datetime import datetime
+
+PARAMS_FILE = os.environ.get('MLP_PARAMS_FILE', os.path.join('data', 'mlp_params.json'))
+# Epoch limit of the production MLP. Training normally stops well before, once
+# the loss stops improving by more than tol for n_iter_no_change epochs.
+PRODUCTION_MAX_ITER = 2000
+
+SEARCH_SPACE = {
+    'hidden_layer_sizes': [(32,), (64,), (64, 32), (128, 64), (128, 64, 32), (8,) * 8],
+    'alpha': [1e-5, 1e-4, 1e-3, 1e-2],
+    'learning_rate_init': [1e-3, 3e-3, 1e-2],
+}
+
+
+def load_params(path=None):
+    """
+    MLPClassifier parameters chosen by the last search
+
+    Args:
+        path (str): Search report, defaults to PARAMS_FILE
+
+    Returns:
+        dict: Parameters to override the defaults with, empty if there was no search
+    """
+    path = path or PARAMS_FILE
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as infile:
+            params = json.load(infile)['params']
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ignoring unreadable MLP parameters {path}: {e}")
+        return {}
+    if 'hidden_layer_sizes' in params:
+        params['hidden_layer_sizes'] = tuple(params['hidden_layer_sizes'])
+    return params
+
+
+def sample_candidates(n_candidates, seed=42):
+    """Up to n_candidates distinct points of the search space"""
+    grid = [dict(zip(SEARCH_SPACE, values)) for values in itertools.product(*SEARCH_SPACE.values())]
+    if n_candidates >= len(grid):
+        return grid
+    return random.Random(seed).sample(grid, n_candidates)
+
+
+def _new_model(params, random_state):
+    from sklearn.neural_network import MLPClassifier
+    return MLPClassifier(warm_start=True, random_state=random_state, **params)
+
+
+def train_candidate(models, params, folds, epochs, random_state=42):
+    """
+    Train a candidate's per-fold models for `epochs` more epochs and score them
+
+    Args:
+        models (list): The candidate's models from the last round, None in the first
+        params (dict): MLPClassifier parameters
+        folds (list): Scaled (X_train, X_test, y_train, y_test) folds
+        epochs (int): Additional epochs
+
+    Returns:
+        tuple: (models, mean ROC-AUC over the folds)
+    """
+    import numpy as np
+    from sklearn.exceptions import ConvergenceWarning
+    from sklearn.metrics import roc_auc_score
+
+    models = models or [_new_model(params, random_state) for _ in folds]
+    scores = []
+    for model, (X_train, X_test, y_train, y_test) in zip(models, folds):
+        # With warm_start every fit continues from the current weights
+        model.max_iter = epochs
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', ConvergenceWarning)
+            model.fit(X_train, y_train)
+        dangerous = model.predict_proba(X_test)[:, list(model.classes_).index(True)]
+        scores.append(roc_auc_score(y_test, dangerous))
+    return models, float(np.mean(scores))
+
+
+def successive_halving(folds, candidates, min_iter=25, max_iter=675, factor=3, n_jobs=-1):
+    """
+    Keep the best 1/factor of the candidates each round while the budget grows by factor
+
+    Returns:
+        tuple: (best params, its score, epochs it trained for, per-round history)
+    """
+    from joblib import Parallel, delayed
+
+    alive = [{'params': params, 'models': None, 'score': None} for params in candidates]
+    history = []
+    budget, trained = min_iter, 0
+    while True:
+        start = time.perf_counter()
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(train_candidate)(entry['models'], entry['params'], folds, budget - trained)
+            for entry in alive
+        )
+        for entry, (models, score) in zip(alive, results):
+            entry['models'], entry['score'] = models, score
+        trained = budget
+        alive.sort(key=lambda entry: entry['score'], reverse=True)
+
+        history.append({
+            'epochs': budget,
+            'candidates': len(alive),
+            'seconds': time.perf_counter() - start,
+            'best_score': alive[0]['score'],
+            'best_params': alive[0]['params'],
+        })
+        print(f"{budget:5d} epochs: {len(alive):3d} candidates, best ROC-AUC {alive[0]['score']:.4f} "
+              f"{alive[0]['params']} ({history[-1]['seconds']:.1f}s)")
+
+        if len(alive) == 1 or budget * factor > max_iter:
+            break
+        alive = alive[:max(1, len(alive) // factor)]
+        budget *= factor
+
+    best = alive[0]
+    # loss_curve_ spans every warm-started fit, count the epochs the winner ran in total
+    epochs = max(len(model.loss_curve_) for model in best['models'])
+    return best['params'], best['score'], epochs, history
+
+
+def production_epochs(params, X, y, max_iter=PRODUCTION_MAX_ITER, random_state=42):
+    """
+    Epochs the MLP needs to converge when train_models fits it
+
+    The search epochs are no guide: each warm-started fit restarts adam's
+    moment estimates, and the folds are smaller than the training split.
+
+    Returns:
+        tuple: (epochs, True if training stopped on convergence before max_iter)
+    """
+    from sklearn.exceptions import ConvergenceWarning
+    from sklearn.neural_network import MLPClassifier
+    from app import training_split
+
+    _, X_train, _, y_train, _ = training_split(X, y)
+    model = MLPClassifier(max_iter=max_iter, random_state=random_state, **params)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', ConvergenceWarning)
+        model.fit(X_train, y_train)
+    converged = not any(issubclass(warning.category, ConvergenceWarning) for warning in caught)
+    return model.n_iter_, converged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Search MLP hyperparameters with successive halving')
+    parser.add_argument('--data', default=None,
+                        help='Training data file (default: DATA_FILE, the file the app serves)')
+    parser.add_argument('--candidates', type=int, default=27, help='Configurations to start with')
+    parser.add_argument('--min-iter', type=int, default=25, help='Epochs every candidate gets')
+    parser.add_argument('--max-iter', type=int, default=675, help='Most epochs a candidate can get')
+    parser.add_argument('--factor', type=int, default=3, help='Keep 1/factor of the candidates per round')
+    parser.add_argument('--folds', type=int, default=3, help='Cross-validation folds')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel candidates (default: all cores)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for sampling candidates')
+    parser.add_argument('--output', default=PARAMS_FILE, help='Where to write the best parameters')
+    args = parser.parse_args(argv)
+
+    from app import AvalanchePredictor, DATA_FILE
+
+    args.data = args.data or DATA_FILE
+    from evaluation import make_folds
+
+    predictor = AvalanchePredictor()
+    if not predictor.load_data(args.data):
+        return 1
+    X = predictor.data[predictor.feature_columns].to_numpy(dtype=float)
+    y = predictor.data['Dangerous'].to_numpy(dtype=bool)
+    folds = make_folds(X, y, args.folds)
+
+    candidates = sample_candidates(args.candidates, args.seed)
+    print(f"Searching {len(candidates)} MLP configurations on {len(X)} rows with {args.folds} folds...")
+    start = time.perf_counter()
+    params, score, epochs, history = successive_halving(
+        folds, candidates, args.min_iter, args.max_iter, args.factor, args.jobs)
+    seconds = time.perf_counter() - start
+
+    print(f"\nBest ROC-AUC {score:.4f} after {epochs} epochs in {seconds:.0f}s: {params}")
+
+    needed, converged = production_epochs(params, X, y)
+    if converged:
+        print(f"Converges on the production training split after {needed} epochs")
+    else:
+        print(f"WARNING: does not converge on the production training split within {needed} epochs")
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'data_hash': predictor.data_hash,
+        'score': score,
+        'metric': 'roc_auc',
+        'seconds': seconds,
+        'search_epochs': epochs,
+        'production_epochs': needed,
+        'converged': converged,
+        'params': dict(params, max_iter=PRODUCTION_MAX_ITER),
+        'history': history,
+    }
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as outfile:
+        json.dump(report, outfile, indent=2)
+    print(f"Saved parameters to {args.output}, retrain with `python model_store.py --force`")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
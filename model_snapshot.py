@@ -0,0 +1,67 @@
+"""
+Immutable bundle of the data and fitted models a prediction reads.
+
+AvalanchePredictor serves from one ModelSnapshot and replaces it with a single
+reference assignment. A request that took the snapshot keeps a matching
+scaler and model set for its whole run, even while a reload swaps in a new
+snapshot next to it.
+"""
+
+from datetime import datetime
+from types import MappingProxyType
+
+
+class ModelSnapshot:
+    __slots__ = ('data', 'data_file', 'data_hash', 'feature_columns', 'scaler', 'models', 'version',
+                 'loaded_at')
+
+    def __init__(self, data=None, data_file=None, data_hash=None, feature_columns=(), scaler=None,
+                 models=None, version=None):
+        """
+        Args:
+            data (pd.DataFrame): Cleaned dataset, treated as read-only
+            data_file (str): File the data was loaded from
+            data_hash (str): SHA-256 of that file
+            feature_columns (list): Model inputs in order
+            scaler: Fitted scaler for the feature columns
+            models (dict): Model name -> fitted model
+            version (str): Creation time of the artifact the models came from
+        """
+        fields = {
+            'data': data,
+            'data_file': data_file,
+            'data_hash': data_hash,
+            'feature_columns': list(feature_columns),
+            'scaler': scaler,
+            'models': MappingProxyType(dict(models or {})),
+            'version': version,
+            'loaded_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ModelSnapshot is immutable, use replace()')
+
+    def replace(self, **changes):
+        """A new snapshot with some fields changed"""
+        fields = {name: getattr(self, name) for name in self.__slots__ if name != 'loaded_at'}
+        fields.update(changes)
+        return ModelSnapshot(**fields)
+
+    @property
+    def ready(self):
+        """True if predictions can be served from this snapshot"""
+        return self.data is not None and bool(self.models)
+
+    def warm_up(self):
+        """Score one row with every model so the first real request does not pay one-off costs"""
+        import numpy as np
+
+        row = np.asarray(self.scaler.mean_, dtype=np.float64).reshape(1, -1)
+        scaled = self.scaler.transform(row)
+        for model in self.models.values():
+            if hasattr(model, 'predict_proba'):
+                model.predict_proba(scaled)
+            else:
+                model.predict(scaled)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Versioned on-disk store for trained AvalanchePredictor models.
+
+An artifact bundles the fitted scaler, the feature column list and every
+trained model together with the SHA-256 of the CSV they were trained on, so
+the app can warm-start from disk and only retrain when the data changes.
+"""
+
+import argparse
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from datetime import datetime
+
+import mlp_search
+
+ARTIFACT_DIR = os.environ.get('MODEL_ARTIFACT_DIR', 'models')
+ARTIFACT_FORMAT = 2
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sklearn_version():
+    import sklearn
+    return sklearn.__version__
+
+
+def artifact_path(data_hash, artifact_dir=None):
+    """Path of the artifact trained on the data with the given hash, in ARTIFACT_DIR by default"""
+    return os.path.join(artifact_dir or ARTIFACT_DIR, f'avalanche-models-{data_hash[:16]}.pkl')
+
+
+def build_artifact(predictor):
+    """Collect everything needed to serve predictions from a trained predictor"""
+    snapshot = predictor.snapshot
+    return {
+        'format': ARTIFACT_FORMAT,
+        'data_hash': snapshot.data_hash,
+        'data_file': snapshot.data_file,
+        'feature_columns': list(snapshot.feature_columns),
+        'scaler': snapshot.scaler,
+        'models': dict(snapshot.models),
+        'mlp_params': mlp_search.load_params(),
+        'sklearn_version': _sklearn_version(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def save_artifact(artifact, artifact_dir=None):
+    """Atomically write an artifact to disk and return its path"""
+    artifact_dir = artifact_dir or ARTIFACT_DIR
+    os.makedirs(artifact_dir, exist_ok=True)
+    path = artifact_path(artifact['data_hash'], artifact_dir)
+
+    # Write to a temp file first so a crash never leaves a truncated artifact
+    fd, tmp_path = tempfile.mkstemp(dir=artifact_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as outfile:
+            pickle.dump(artifact, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def load_artifact(data_hash, artifact_dir=None):
+    """
+    Load the artifact matching a data hash
+
+    Returns:
+        dict: The artifact, or None if there is no usable artifact for this data
+    """
+    path = artifact_path(data_hash, artifact_dir)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'rb') as infile:
+            artifact = pickle.load(infile)
+    except Exception as e:
+        print(f"Ignoring unreadable model artifact {path}: {e}")
+        return None
+
+    if artifact.get('format') != ARTIFACT_FORMAT or artifact.get('data_hash') != data_hash:
+        print(f"Ignoring stale model artifact {path}")
+        return None
+    if artifact.get('mlp_params', {}) != mlp_search.load_params():
+        print(f"Ignoring model artifact {path} trained with other MLP parameters")
+        return None
+    if artifact.get('sklearn_version') != _sklearn_version():
+        # Pickled estimators are not portable across scikit-learn versions
+        print(f"Ignoring model artifact {path} built with scikit-learn {artifact.get('sklearn_version')}")
+        return None
+
+    return artifact
+
+
+def file_stamp(path):
+    """
+    (mtime, size) of a file, None if it does not exist
+
+    A directory is stamped by the model artifacts in it, so other files kept
+    there (such as shared forecasts) do not count as a change.
+    """
+    try:
+        if os.path.isdir(path):
+            stamps = []
+            for name in sorted(os.listdir(path)):
+                if name.startswith('avalanche-models-') and name.endswith('.pkl'):
+                    stamps.append((name, file_stamp(os.path.join(path, name))))
+            return tuple(stamps)
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ArtifactWatcher:
+    """Poll files in a daemon thread and call a function when any of them changes"""
+
+    def __init__(self, paths, on_change, interval=10):
+        """
+        Args:
+            paths (callable): Returns the paths to watch, evaluated on every poll
+                since the artifact to watch depends on the loaded data
+            on_change (callable): Called with no arguments after a change
+            interval (float): Seconds between polls
+        """
+        self.paths = paths
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stamps(self):
+        return {path: file_stamp(path) for path in self.paths()}
+
+    def _run(self):
+        stamps = self._stamps()
+        while not self._stop.wait(self.interval):
+            current = self._stamps()
+            if current != stamps:
+                try:
+                    self.on_change()
+                except Exception as e:
+                    print(f"Error handling model artifact change: {e}")
+                # Re-read, on_change may have switched to different files
+                current = self._stamps()
+            stamps = current
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='artifact-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    """Build model artifacts offline"""
+    parser = argparse.ArgumentParser(description='Train avalanche models and save them as a versioned artifact')
+    parser.add_argument('--data', default=None,
+                        help='Training data file (default: DATA_FILE, the file the app serves)')
+    parser.add_argument('--artifact-dir', default=ARTIFACT_DIR, help='Directory to store artifacts in')
+    parser.add_argument('--force', action='store_true', help='Retrain even if a matching artifact exists')
+    args = parser.parse_args(argv)
+
+    # Imported here to avoid a circular import, app.py uses this module
+    from app import AvalanchePredictor, DATA_FILE
+
+    args.data = args.data or DATA_FILE
+
+    predictor = AvalanchePredictor()
+    if not predictor.load_data(args.data):
+        return 1
+
+    if not args.force and load_artifact(predictor.data_hash, args.artifact_dir) is not None:
+        print(f"Artifact for {args.data} is up to date: {artifact_path(predictor.data_hash, args.artifact_dir)}")
+        return 0
+
+    if not predictor.train_models():
+        print("Model training failed")
+        return 1
+
+    path = save_artifact(build_artifact(predictor), args.artifact_dir)
+    print(f"Saved model artifact to {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
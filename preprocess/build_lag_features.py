@@ -0,0 +1,158 @@
+#!/bin/python3
+"""
+Build lagged and rolling weather features and join them to the avalanches.
+
+The lagged weather table (one row per Location and day) is cached on disk and
+updated incrementally: when new days arrive only those days, plus the few
+days of history their windows need, are computed. The avalanche join that
+produces full_avalanche_weather_w_lag.csv is then redone from that table.
+"""
+
+import argparse
+import os
+
+import pandas as pd
+
+LAG_COLUMNS = ['maxtempC', 'mintempC', 'totalSnow_cm', 'sunHour', 'uvIndex']
+LAGS = 3
+ROLLING_DAYS = 3
+
+# Same-day weather columns kept in full_avalanche_weather_w_lag.csv
+WEATHER_COLUMNS = ['maxtempC', 'mintempC', 'totalSnow_cm', 'sunHour', 'uvIndex', 'DewPointC',
+                   'FeelsLikeC', 'HeatIndexC', 'WindChillC', 'WindGustKmph', 'humidity',
+                   'precipMM', 'pressure', 'tempC', 'winddirDegree', 'windspeedKmph']
+
+
+def lag_feature_columns(lags=LAGS):
+    return [f'{col}_{lag}' for lag in range(1, lags + 1) for col in LAG_COLUMNS]
+
+
+def rolling_feature_columns(days=ROLLING_DAYS):
+    hours = days * 24
+    return ['temp_swing', f'totalSnow_cm_{hours}h', f'precipMM_{hours}h', f'temp_swing_{hours}h']
+
+
+def history_days(lags=LAGS, days=ROLLING_DAYS):
+    """Days of earlier weather needed to compute the features of a day"""
+    return max(lags, days - 1)
+
+
+def load_weather(weather_file):
+    weather = pd.read_csv(weather_file, index_col=0)
+    weather['Date'] = pd.to_datetime(weather['Date'])
+    return weather
+
+
+def compute_features(weather, lags=LAGS, days=ROLLING_DAYS):
+    """
+    Add lag and rolling-window features to daily weather
+
+    Lags are matched by calendar date rather than row position, so missing days
+    give missing features instead of silently shifting older values in.
+    """
+    weather = weather.sort_values(['Location', 'Date']).reset_index(drop=True)
+    keyed = weather.set_index(['Location', 'Date'])[LAG_COLUMNS]
+
+    features = weather.copy()
+    for lag in range(1, lags + 1):
+        # Re-key each day's values onto the day `lag` days later
+        lagged = keyed.rename(index=lambda date: date + pd.Timedelta(days=lag), level='Date')
+        lagged = lagged.add_suffix(f'_{lag}')
+        features = features.join(lagged, on=['Location', 'Date'])
+
+    hours = days * 24
+    window = f'{days}D'
+    by_location = weather.set_index('Date').groupby('Location')
+    sums = by_location[['totalSnow_cm', 'precipMM']].rolling(window).sum()
+    highs = by_location['maxtempC'].rolling(window).max()
+    lows = by_location['mintempC'].rolling(window).min()
+
+    # Rolling results come back sorted by (Location, Date), like `features`
+    features['temp_swing'] = features['maxtempC'] - features['mintempC']
+    features[f'totalSnow_cm_{hours}h'] = sums['totalSnow_cm'].to_numpy()
+    features[f'precipMM_{hours}h'] = sums['precipMM'].to_numpy()
+    features[f'temp_swing_{hours}h'] = (highs - lows).to_numpy()
+    return features
+
+
+def update_features(weather, existing=None, lags=LAGS, days=ROLLING_DAYS):
+    """
+    Compute features only for days missing from an existing feature table
+
+    Returns:
+        pd.DataFrame: The existing features plus the newly computed days
+    """
+    if existing is None or existing.empty:
+        return compute_features(weather, lags, days)
+
+    last_done = existing.groupby('Location')['Date'].max()
+    done_until = weather['Location'].map(last_done)
+    is_new = done_until.isna() | (weather['Date'] > done_until)
+    if not is_new.any():
+        return existing
+
+    # New days plus the history their lag and rolling windows reach back to
+    first_new = weather[is_new].groupby('Location')['Date'].min()
+    context_start = weather['Location'].map(first_new) - pd.Timedelta(days=history_days(lags, days))
+    context = weather[weather['Date'] >= context_start]
+
+    fresh = compute_features(context, lags, days)
+    fresh_start = fresh['Location'].map(first_new)
+    fresh = fresh[fresh['Date'] >= fresh_start]
+
+    print(f"Computed features for {len(fresh)} new days")
+    return (pd.concat([existing, fresh], ignore_index=True)
+            .sort_values(['Location', 'Date'])
+            .reset_index(drop=True))
+
+
+def join_avalanches(avalanches, features, lags=LAGS, days=ROLLING_DAYS):
+    """Attach each avalanche's weather features by weather Location id and date"""
+    avalanches = avalanches.copy()
+    avalanches['Location'] = pd.to_numeric(avalanches['Location'], errors='coerce')
+    avalanches['Date'] = pd.to_datetime(avalanches['Date'], format='mixed', errors='coerce')
+    avalanches = avalanches.dropna(subset=['Location', 'Date'])
+    avalanches['Location'] = avalanches['Location'].astype(features['Location'].dtype)
+
+    columns = WEATHER_COLUMNS + lag_feature_columns(lags) + rolling_feature_columns(days)
+    joined = avalanches[['Dangerous', 'Location', 'Date']].merge(
+        features[['Location', 'Date'] + columns], on=['Location', 'Date'], how='inner')
+    joined = joined.rename(columns={'Location': 'Location_x'})
+    return joined[['Dangerous', 'Location_x'] + columns].reset_index(drop=True)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Build lagged weather features for the avalanche records')
+    parser.add_argument('--weather', default='all_weather_data.csv', help='Daily weather per Location')
+    parser.add_argument('--avalanches', default='allData.csv', help='Avalanche records')
+    parser.add_argument('--features', default='all_weather_data_lagged.csv',
+                        help='Cached lagged weather table, updated incrementally')
+    parser.add_argument('--output', default='full_avalanche_weather_w_lag.csv')
+    parser.add_argument('--lags', type=int, default=LAGS, help='Days of lagged values')
+    parser.add_argument('--window', type=int, default=ROLLING_DAYS, help='Rolling window in days')
+    parser.add_argument('--full', action='store_true', help='Recompute every day instead of only new ones')
+    args = parser.parse_args(args)
+
+    weather = load_weather(args.weather)
+
+    existing = None
+    if not args.full and os.path.exists(args.features):
+        existing = pd.read_csv(args.features, parse_dates=['Date'])
+        expected = lag_feature_columns(args.lags) + rolling_feature_columns(args.window)
+        if not set(expected) <= set(existing.columns):
+            print("Cached features use different settings, recomputing")
+            existing = None
+
+    features = update_features(weather, existing, args.lags, args.window)
+    if features is not existing:
+        features.to_csv(args.features, index=False)
+        print(f"Saved {len(features)} days of features to {args.features}")
+
+    joined = join_avalanches(pd.read_csv(args.avalanches), features, args.lags, args.window)
+    joined.to_csv(args.output)
+    print(f"Saved {len(joined)} avalanche records with lagged weather to {args.output}")
+
+
+if __name__ == "__main__":
+    import sys
+    main(sys.argv[1:])
@@ -0,0 +1,112 @@
+"""
+Typed loader for allData.csv shared by the process/ experiment scripts.
+
+The CSV is parsed once into a column-major float64 matrix of its numeric
+columns plus a boolean label vector. Both are cached as .npy files next to
+the CSV and memory-mapped on later runs, so experiments start without
+re-parsing text. The cache is rebuilt whenever the CSV's size or
+modification time changes.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CACHE_FORMAT = 1
+
+
+class Dataset:
+    def __init__(self, features, labels, columns):
+        """
+        Args:
+            features (np.ndarray): n_rows x n_columns float64 matrix, Fortran ordered
+            labels (np.ndarray): Boolean label per row
+            columns (list): Name of each feature column
+        """
+        self.features = features
+        self.labels = labels
+        self.columns = list(columns)
+        self.index = {name: position for position, name in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def column(self, name):
+        """Zero-copy view of a single column"""
+        return self.features[:, self.index[name]]
+
+    def select(self, names):
+        """
+        Matrix of the named columns
+
+        Adjacent runs of columns are returned as views; any other selection is
+        gathered from the already-typed matrix without re-parsing.
+        """
+        positions = [self.index[name] for name in names]
+        start = positions[0]
+        if positions == list(range(start, start + len(positions))):
+            return self.features[:, start:start + len(positions)]
+        return np.take(self.features, positions, axis=1)
+
+
+def _cache_paths(csv_path):
+    base = os.path.splitext(csv_path)[0]
+    return base + '.features.npy', base + '.labels.npy', base + '.columns.json'
+
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _parse_csv(csv_path, label_column):
+    frame = pd.read_csv(csv_path)
+    labels = frame[label_column]
+    if labels.dtype == object:
+        labels = labels.map({'TRUE': True, 'True': True, 'FALSE': False, 'False': False})
+    labels = labels.fillna(False).to_numpy(dtype=bool)
+
+    numeric = frame.drop(columns=[label_column]).select_dtypes('number')
+    features = np.asfortranarray(numeric.to_numpy(dtype=np.float64))
+    return features, labels, list(numeric.columns)
+
+
+def load_dataset(csv_path='./allData.csv', label_column='Dangerous', use_cache=True):
+    """
+    Load the numeric columns and labels of a CSV, using the .npy cache if it is current
+
+    Returns:
+        Dataset: The typed feature matrix, labels and column index
+    """
+    features_path, labels_path, meta_path = _cache_paths(csv_path)
+    stamp = _source_stamp(csv_path)
+
+    if use_cache and os.path.exists(meta_path):
+        with open(meta_path) as infile:
+            meta = json.load(infile)
+        if (meta.get('format') == CACHE_FORMAT and meta.get('source') == stamp
+                and meta.get('label_column') == label_column):
+            features = np.load(features_path, mmap_mode='r')
+            labels = np.load(labels_path, mmap_mode='r')
+            return Dataset(features, labels, meta['columns'])
+
+    features, labels, columns = _parse_csv(csv_path, label_column)
+
+    if use_cache:
+        try:
+            np.save(features_path, features)
+            np.save(labels_path, labels)
+            # Written last, so a partially written cache is never considered current
+            with open(meta_path, mode='w') as outfile:
+                json.dump({
+                    'format': CACHE_FORMAT,
+                    'source': stamp,
+                    'label_column': label_column,
+                    'columns': columns,
+                }, outfile)
+        except OSError as e:
+            print(f"Could not write dataset cache for {csv_path}: {e}")
+
+    return Dataset(features, labels, columns)
@@ -0,0 +1,173 @@
+"""
+Feature-subset search shared by the process/ experiment scripts.
+
+Every subset is identified by a canonical frozenset of column indices, so a
+subset is fitted at most once no matter how a strategy reaches it. Fits are
+fanned out across a process pool whose workers receive the data once at
+startup, and each result is appended to a JSON Lines file.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+STRATEGIES = ('exhaustive', 'greedy', 'beam')
+
+# Set in each worker process by _init_worker
+_worker = {}
+
+
+def _init_worker(evaluate, X, y):
+    _worker['evaluate'] = evaluate
+    _worker['X'] = X
+    _worker['y'] = y
+    try:
+        # One BLAS thread per process, the pool already uses every core
+        from threadpoolctl import threadpool_limits
+        _worker['limits'] = threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def _evaluate_subset(columns):
+    start = time.perf_counter()
+    result = _worker['evaluate'](_worker['X'][:, columns], _worker['y'])
+    if not isinstance(result, dict):
+        result = {'score': result}
+    result['score'] = float(result['score'])
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def add_search_arguments(parser):
+    """Add the command line options understood by FeatureSearch.run"""
+    parser.add_argument('--strategy', choices=STRATEGIES, default='exhaustive',
+                        help='How to explore feature subsets')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: all cores, 1 runs in-process)')
+    parser.add_argument('--beam-width', type=int, default=3,
+                        help='Subsets kept per level by the beam strategy')
+    return parser
+
+
+def parse_search_args(description, argv=None):
+    return add_search_arguments(argparse.ArgumentParser(description=description)).parse_args(argv)
+
+
+class FeatureSearch:
+    def __init__(self, evaluate, X, y, headers, workers=None, results_path=None):
+        """
+        Args:
+            evaluate (callable): evaluate(X_subset, y) -> score or dict with a 'score' key.
+                Must be picklable (a module-level function) when workers != 1.
+            X (np.ndarray): Feature matrix, one column per header
+            y (np.ndarray): Labels
+            headers (list): Column names of X
+            workers (int): Worker processes, None for all cores, 1 to run in-process
+            results_path (str): JSON Lines file each result is appended to
+        """
+        self.evaluate = evaluate
+        self.X = X
+        self.y = y
+        self.headers = list(headers)
+        self.workers = workers or os.cpu_count() or 1
+        self.results_path = results_path
+        self.results = {}
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _map(self, column_lists):
+        if self.workers == 1:
+            _init_worker(self.evaluate, self.X, self.y)
+            return map(_evaluate_subset, column_lists)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.evaluate, self.X, self.y),
+            )
+        return self._pool.map(_evaluate_subset, column_lists)
+
+    def evaluate_subsets(self, subsets):
+        """
+        Score subsets of column indices, fitting each distinct subset only once
+
+        Returns:
+            list: Result dicts in the order of the given subsets
+        """
+        keys = [frozenset(subset) for subset in subsets]
+        pending = []
+        for key in keys:
+            if key and key not in self.results and key not in pending:
+                pending.append(key)
+
+        column_lists = [sorted(key) for key in pending]
+        for key, columns, result in zip(pending, column_lists, self._map(column_lists)):
+            result['features'] = [self.headers[index] for index in columns]
+            self.results[key] = result
+            self._write(result)
+
+        return [self.results[key] for key in keys if key]
+
+    def _write(self, result):
+        print(f"{result['score']:.4f} {result['features']}")
+        if self.results_path is None:
+            return
+        with open(self.results_path, mode='a') as outfile:
+            outfile.write(json.dumps(result) + '\n')
+
+    def exhaustive(self):
+        """Score every non-empty subset"""
+        indices = range(len(self.headers))
+        subsets = [
+            combo
+            for size in range(len(self.headers), 0, -1)
+            for combo in itertools.combinations(indices, size)
+        ]
+        return max(self.evaluate_subsets(subsets), key=lambda result: result['score'])
+
+    def beam(self, width=3):
+        """
+        Backward elimination keeping the best `width` subsets at each size
+
+        Returns the best subset seen at any size.
+        """
+        level = [frozenset(range(len(self.headers)))]
+        best = self.evaluate_subsets(level)[0]
+
+        while len(next(iter(level))) > 1:
+            candidates = {parent - {index} for parent in level for index in parent}
+            scored = self.evaluate_subsets(list(candidates))
+            scored.sort(key=lambda result: result['score'], reverse=True)
+            if scored[0]['score'] > best['score']:
+                best = scored[0]
+            level = [frozenset(self.headers.index(name) for name in result['features'])
+                     for result in scored[:width]]
+
+        return best
+
+    def greedy_backward(self):
+        """Backward elimination following the single best subset at each size"""
+        return self.beam(width=1)
+
+    def run(self, strategy='exhaustive', beam_width=3):
+        if strategy == 'exhaustive':
+            return self.exhaustive()
+        if strategy == 'greedy':
+            return self.greedy_backward()
+        if strategy == 'beam':
+            return self.beam(beam_width)
+        raise ValueError(f"Unknown strategy: {strategy}")
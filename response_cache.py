@@ -0,0 +1,76 @@
+"""
+Pre-serialized JSON responses for the read-only dashboard APIs.
+
+Each entry is computed once per dataset version and kept as encoded bytes
+with a strong ETag, so repeat requests skip both the pandas aggregation and
+JSON serialization. Entries are dropped as soon as a different dataset
+version is requested.
+"""
+
+import hashlib
+import json
+import threading
+
+
+def _json_default(value):
+    """Serialize numpy scalars and arrays"""
+    if hasattr(value, 'item') and getattr(value, 'ndim', 0) == 0:
+        return value.item()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class CachedResponse:
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+
+
+class ResponseCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, version, build):
+        """
+        Return the cached response for an endpoint, building it if needed
+
+        Args:
+            name (str): Cache key, usually the endpoint name
+            version (str): Dataset version the response is computed from
+            build (callable): Returns the JSON-serializable payload
+        """
+        with self._lock:
+            if version != self._version:
+                self._entries = {}
+                self._version = version
+            entry = self._entries.get(name)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        body = json.dumps(build(), default=_json_default).encode('utf-8')
+        entry = CachedResponse(body, hashlib.sha1(body).hexdigest())
+
+        with self._lock:
+            # Don't store a response for a version that was replaced meanwhile
+            if version == self._version:
+                self._entries[name] = entry
+        return entry
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._version = None
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+# Columns that identify an avalanche record in the dataset
+KEY_COLUMNS = ['Date', 'Area', 'latitude', 'longitude']
+
+
+def record_keys(frame):
+    """Normalized (date, area, lat, lon) key of each row, so 1/5/2024 and 2024-01-05 match"""
+    dates = pd.to_datetime(frame['Date'], format='mixed', errors='coerce').dt.strftime('%Y-%m-%d')
+    dates = dates.fillna(frame['Date'].astype(str))
+    areas = frame['Area'].astype(str).str.strip()
+    # Text so rounding noise and missing coordinates still compare equal
+    latitudes = pd.to_numeric(frame['latitude'], errors='coerce').round(6).astype(str)
+    longitudes = pd.to_numeric(frame['longitude'], errors='coerce').round(6).astype(str)
+    return list(zip(dates, areas, latitudes, longitudes))
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return f'{stat.st_size}:{stat.st_mtime_ns}'
+
+
+class KeyIndex:
+    """
+    Persistent SQLite index of the record keys in a dataset CSV.
+
+    Lets a merge check only the incoming rows and append the new ones to the
+    CSV, so an update costs O(new rows) instead of re-reading the history.
+    The index stores the dataset's size and mtime after its last write. If
+    the CSV was changed by anything else, the index is rebuilt from it once.
+    """
+
+    def __init__(self, dataset_file, path=None, chunksize=100000):
+        """
+        Args:
+            dataset_file (str): Dataset CSV the index belongs to
+            path (str): SQLite database file, defaults to <dataset>.keys.sqlite
+            chunksize (int): Rows read at a time when rebuilding
+        """
+        self.dataset_file = dataset_file
+        self.path = path or os.path.splitext(dataset_file)[0] + '.keys.sqlite'
+        self.chunksize = chunksize
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS record_keys ('
+            ' date TEXT NOT NULL,'
+            ' area TEXT NOT NULL,'
+            ' latitude TEXT NOT NULL,'
+            ' longitude TEXT NOT NULL,'
+            ' PRIMARY KEY (date, area, latitude, longitude))'
+        )
+        self.connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+        self.connection.commit()
+        if not self.is_current():
+            self.rebuild()
+
+    def _stored_stamp(self):
+        row = self.connection.execute("SELECT value FROM meta WHERE name = 'dataset_stamp'").fetchone()
+        return row[0] if row else None
+
+    def _set_stamp(self):
+        self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('dataset_stamp', ?)",
+                                (file_stamp(self.dataset_file),))
+
+    def is_current(self):
+        """True if the index matches the dataset as it is on disk"""
+        return self._stored_stamp() == file_stamp(self.dataset_file)
+
+    def rebuild(self):
+        """Re-index every record of the dataset"""
+        print(f"Indexing record keys of {self.dataset_file}...")
+        with self.lock:
+            self.connection.execute('DELETE FROM record_keys')
+            for chunk in pd.read_csv(self.dataset_file, usecols=KEY_COLUMNS, chunksize=self.chunksize):
+                self.connection.executemany('INSERT OR IGNORE INTO record_keys VALUES (?, ?, ?, ?)',
+                                            record_keys(chunk))
+            self._set_stamp()
+            self.connection.commit()
+        print(f"Indexed {len(self)} record keys")
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM record_keys').fetchone()[0]
+
+    def __contains__(self, key):
+        return self.connection.execute(
+            'SELECT 1 FROM record_keys WHERE date = ? AND area = ? AND latitude = ? AND longitude = ?',
+            key).fetchone() is not None
+
+    def new_rows(self, rows):
+        """Rows whose key is not in the dataset, keeping the first of any duplicates among them"""
+        keys = record_keys(rows)
+        seen = set()
+        is_new = []
+        for key in keys:
+            is_new.append(key not in seen and key not in self)
+            seen.add(key)
+        return rows[is_new]
+
+    def append(self, rows):
+        """
+        Append new rows to the dataset CSV and index their keys
+
+        Args:
+            rows (pd.DataFrame): Rows in the dataset's column order
+
+        Returns:
+            int: Number of rows appended
+        """
+        if not self.is_current():
+            self.rebuild()
+        with self.lock:
+            new_rows = self.new_rows(rows)
+            if new_rows.empty:
+                return 0
+            # Keys, file and stamp are committed together. If writing the CSV
+            # fails the keys roll back and a stale stamp forces a rebuild.
+            try:
+                self.connection.executemany('INSERT OR IGNORE INTO record_keys VALUES (?, ?, ?, ?)',
+                                            record_keys(new_rows))
+                new_rows.to_csv(self.dataset_file, mode='a', header=False, index=False)
+                self._set_stamp()
+                self.connection.commit()
+            except BaseException:
+                self.connection.rollback()
+                raise
+        return len(new_rows)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
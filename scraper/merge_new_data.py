@@ -1,78 +1,122 @@
 #!/usr/bin/env python3
 
+import argparse
 import pandas as pd
-import csv
 from datetime import datetime
 
-def merge_new_avalanche_data():
+# Positions of the scraped columns used for enrichment
+SCRAPED_COLUMNS = {'Date': 0, 'Area': 1, 'Trigger': 3, 'Depth': 4, 'Width': 5}
+
+OUTPUT_COLUMNS = ['Date', 'Area', 'Region', 'Trigger', 'Depth', 'Width',
+                  'longitude', 'latitude', 'altitude', 'Dangerous']
+
+# Read location names as text, so numeric ones like 10420 still match across files and chunks
+TEXT_COLUMNS = {'Area': str, 'Location': str}
+
+
+def build_coordinate_lookup(existing_data):
+    """One row of coordinates per Area, the last occurrence in the dataset wins"""
+    lookup = existing_data.dropna(subset=['Area', 'longitude', 'latitude'])
+    lookup = lookup.drop_duplicates(subset='Area', keep='last')
+    lookup = lookup[['Area', 'longitude', 'latitude', 'altitude']].copy()
+    lookup['altitude'] = lookup['altitude'].fillna(0.0)
+    return lookup
+
+
+def enrich_records(new_data, lookup):
+    """
+    Add coordinates to scraped records with a single join
+
+    Returns:
+        tuple: (enhanced DataFrame, counts of unmatched locations)
+    """
+    scraped = pd.DataFrame({
+        name: new_data.iloc[:, position] if new_data.shape[1] > position else None
+        for name, position in SCRAPED_COLUMNS.items()
+    })
+    merged = scraped.merge(lookup, on='Area', how='left', indicator=True)
+
+    matched = merged['_merge'] == 'both'
+    unmatched = merged.loc[~matched, 'Area'].value_counts(dropna=False)
+
+    enhanced = merged.loc[matched].copy()
+    # The left join made the coordinate columns nullable, restore their dtypes
+    enhanced = enhanced.astype(lookup.dtypes.drop('Area').to_dict())
+    enhanced['Region'] = enhanced['Area']
+    enhanced['Dangerous'] = True  # All scraped avalanches are dangerous by definition
+    return enhanced[OUTPUT_COLUMNS].reset_index(drop=True), unmatched
+
+
+def enrich_chunks(chunks, lookup):
+    """Streaming stage: enrich an iterable of scraped DataFrame chunks"""
+    for chunk in chunks:
+        yield enrich_records(chunk, lookup)
+
+
+def merge_new_avalanche_data(input_file='avalanches_scraped_20251015_092953.csv',
+                             existing_file='../allData.csv', chunksize=None):
     """Merge new avalanche data with existing coordinate data"""
-    
+
     print("Loading existing coordinate mappings...")
-    
+
     # Load existing coordinate data from the original dataset
-    existing_data = pd.read_csv('../allData.csv')
-    
-    # Create a mapping of Area names to coordinates
-    coord_mapping = {}
-    for _, row in existing_data.iterrows():
-        if pd.notna(row['Area']) and pd.notna(row['longitude']) and pd.notna(row['latitude']):
-            coord_mapping[row['Area']] = {
-                'longitude': row['longitude'],
-                'latitude': row['latitude'],
-                'altitude': row['altitude'] if pd.notna(row['altitude']) else 0.0
-            }
-    
-    print(f"Found coordinate mappings for {len(coord_mapping)} locations")
-    
-    # Load new avalanche data
+    existing_data = pd.read_csv(existing_file, usecols=['Area', 'longitude', 'latitude', 'altitude'],
+                                dtype=TEXT_COLUMNS)
+    lookup = build_coordinate_lookup(existing_data)
+
+    print(f"Found coordinate mappings for {len(lookup)} locations")
+
+    # Load new avalanche data, optionally as a stream of chunks
     print("Loading new avalanche data...")
-    new_data = pd.read_csv('avalanches_scraped_20251015_092953.csv')
-    
-    print(f"Loaded {len(new_data)} new avalanche records")
-    
-    # Process new data and add coordinates
-    enhanced_records = []
-    
-    for _, row in new_data.iterrows():
-        location = row.iloc[1] if len(row) > 1 else None  # Region column
-        
-        if location and location in coord_mapping:
-            coords = coord_mapping[location]
-            enhanced_records.append({
-                'Date': row.iloc[0],  # Date
-                'Area': location,
-                'Region': location,
-                'Trigger': row.iloc[3] if len(row) > 3 else None,  # Trigger
-                'Depth': row.iloc[4] if len(row) > 4 else None,  # Depth
-                'Width': row.iloc[5] if len(row) > 5 else None,  # Width
-                'longitude': coords['longitude'],
-                'latitude': coords['latitude'],
-                'altitude': coords['altitude'],
-                'Dangerous': True  # All scraped avalanches are dangerous by definition
-            })
-        else:
-            print(f"No coordinates found for location: {location}")
-    
-    print(f"Enhanced {len(enhanced_records)} records with coordinates")
-    
-    # Save enhanced data
-    if enhanced_records:
-        enhanced_df = pd.DataFrame(enhanced_records)
-        output_file = f'avalanches_enhanced_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        enhanced_df.to_csv(output_file, index=False)
+    if chunksize:
+        chunks = pd.read_csv(input_file, chunksize=chunksize, dtype=TEXT_COLUMNS)
+    else:
+        chunks = [pd.read_csv(input_file, dtype=TEXT_COLUMNS)]
+
+    output_file = f'avalanches_enhanced_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    total_enhanced = 0
+    unmatched_counts = []
+    sample = None
+
+    for enhanced_df, unmatched in enrich_chunks(chunks, lookup):
+        unmatched_counts.append(unmatched)
+        if enhanced_df.empty:
+            continue
+        enhanced_df.to_csv(output_file, mode='w' if total_enhanced == 0 else 'a',
+                           header=total_enhanced == 0, index=False)
+        total_enhanced += len(enhanced_df)
+        if sample is None:
+            sample = enhanced_df.head()
+
+    unmatched = pd.concat(unmatched_counts).groupby(level=0, dropna=False).sum() if unmatched_counts else None
+    if unmatched is not None and len(unmatched):
+        print(f"No coordinates found for {int(unmatched.sum())} records at {len(unmatched)} locations:")
+        for location, count in unmatched.sort_values(ascending=False).items():
+            print(f"  {location}: {count}")
+
+    print(f"Enhanced {total_enhanced} records with coordinates")
+
+    if total_enhanced:
         print(f"Saved enhanced data to {output_file}")
-        
+
         # Show sample of new data
         print("\nSample of new avalanche data:")
-        print(enhanced_df.head())
-        
+        print(sample)
+
         return output_file
     else:
         print("No enhanced records created")
         return None
 
 if __name__ == "__main__":
-    output_file = merge_new_avalanche_data()
+    parser = argparse.ArgumentParser(description='Add coordinates to scraped avalanche records')
+    parser.add_argument('input_file', nargs='?', default='avalanches_scraped_20251015_092953.csv',
+                        help='Scraped avalanche CSV')
+    parser.add_argument('--existing', default='../allData.csv', help='Dataset with known Area coordinates')
+    parser.add_argument('--chunksize', type=int, default=None, help='Process the input in chunks of this many rows')
+    args = parser.parse_args()
+
+    output_file = merge_new_avalanche_data(args.input_file, args.existing, args.chunksize)
     if output_file:
         print(f"\nData enhancement complete! Output: {output_file}")
     else:
@@ -1,17 +1,49 @@
 #!/usr/bin/env python3
 
+import argparse
 import pandas as pd
 import os
-from datetime import datetime
 
-def merge_weather_data():
+from key_index import KeyIndex
+
+# Columns of the fetched weather data that are kept in the dataset
+WEATHER_COLUMNS = ['Date', 'Area', 'latitude', 'longitude', 'Dangerous', 'Depth', 'tempC', 'maxtempC',
+                   'mintempC', 'precipMM', 'windspeedKmph', 'winddirDegree', 'pressure', 'cloudcover',
+                   'humidity', 'visibility', 'uvIndex', 'sunHour', 'HeatIndexC', 'WindChillC',
+                   'WindGustKmph', 'DewPointC', 'FeelsLikeC']
+
+
+def to_dataset_rows(weather_df, columns):
+    """
+    Shape fetched weather records like the rows of the existing dataset
+
+    Args:
+        weather_df (pd.DataFrame): Avalanche records with weather columns
+        columns (list): Column order of the existing dataset
+    """
+    weather_clean = weather_df[WEATHER_COLUMNS].copy()
+
+    # Add missing columns that exist in the original dataset
+    for col in [col for col in columns if col not in weather_clean.columns]:
+        if col in ['Location', 'Region']:
+            # These are categorical columns, we'll need to map them
+            weather_clean[col] = weather_clean['Area']  # Use Area as Location/Region
+        else:
+            # For numeric columns, use default values
+            weather_clean[col] = 0
+
+    # Ensure all columns are in the same order as existing dataset
+    return weather_clean[list(columns)]
+
+
+def merge_weather_data(weather_file='avalanches_with_weather_20251015_100341.csv',
+                       existing_file='../allData.csv'):
     """Merge the new weather data with existing avalanche data"""
     
     print("🔄 Merging Weather Data with Existing Dataset")
     print("=" * 50)
     
     # Load the new weather data
-    weather_file = 'avalanches_with_weather_20251015_100341.csv'
     if not os.path.exists(weather_file):
         print(f"❌ Error: {weather_file} not found!")
         return
@@ -21,99 +53,45 @@ def merge_weather_data():
     print(f"Loaded {len(weather_df)} records with weather data")
     
     # Load existing dataset
-    existing_file = '../allData.csv'
     if not os.path.exists(existing_file):
         print(f"❌ Error: {existing_file} not found!")
         return
     
-    print(f"Loading existing dataset from {existing_file}...")
-    existing_df = pd.read_csv(existing_file)
-    print(f"Loaded {len(existing_df)} existing records")
+    # Only the header is needed, new rows are checked against the key index
+    existing_columns = pd.read_csv(existing_file, nrows=0).columns
     
     # Check what columns we have
     print(f"\nWeather data columns: {list(weather_df.columns)}")
-    print(f"Existing data columns: {list(existing_df.columns)}")
+    print(f"Existing data columns: {list(existing_columns)}")
     
     # Prepare the new weather data for merging
     # We need to match the format of the existing dataset
-    weather_columns = {
-        'Date': 'Date',
-        'Area': 'Area', 
-        'latitude': 'latitude',
-        'longitude': 'longitude',
-        'Dangerous': 'Dangerous',
-        'Depth': 'Depth',
-        'tempC': 'tempC',
-        'maxtempC': 'maxtempC',
-        'mintempC': 'mintempC',
-        'precipMM': 'precipMM',
-        'windspeedKmph': 'windspeedKmph',
-        'winddirDegree': 'winddirDegree',
-        'pressure': 'pressure',
-        'cloudcover': 'cloudcover',
-        'humidity': 'humidity',
-        'visibility': 'visibility',
-        'uvIndex': 'uvIndex',
-        'sunHour': 'sunHour',
-        'HeatIndexC': 'HeatIndexC',
-        'WindChillC': 'WindChillC',
-        'WindGustKmph': 'WindGustKmph',
-        'DewPointC': 'DewPointC',
-        'FeelsLikeC': 'FeelsLikeC'
-    }
-    
-    # Select and rename columns from weather data
-    weather_clean = weather_df[list(weather_columns.keys())].copy()
-    weather_clean = weather_clean.rename(columns=weather_columns)
-    
-    # Add missing columns that exist in the original dataset
-    missing_columns = set(existing_df.columns) - set(weather_clean.columns)
+    missing_columns = set(existing_columns) - set(WEATHER_COLUMNS)
     print(f"\nAdding missing columns: {missing_columns}")
+    weather_clean = to_dataset_rows(weather_df, existing_columns)
     
-    for col in missing_columns:
-        if col in ['Location', 'Region']:
-            # These are categorical columns, we'll need to map them
-            weather_clean[col] = weather_clean['Area']  # Use Area as Location/Region
-        else:
-            # For numeric columns, use default values
-            weather_clean[col] = 0
-    
-    # Ensure all columns are in the same order as existing dataset
-    weather_clean = weather_clean[existing_df.columns]
-    
-    # Combine the datasets
-    print(f"\nCombining datasets...")
-    combined_df = pd.concat([existing_df, weather_clean], ignore_index=True)
-    
-    # Remove duplicates based on Date, Area, latitude, longitude
-    print(f"Removing duplicates...")
-    initial_count = len(combined_df)
-    combined_df = combined_df.drop_duplicates(subset=['Date', 'Area', 'latitude', 'longitude'], keep='first')
-    final_count = len(combined_df)
-    print(f"Removed {initial_count - final_count} duplicate records")
-    
-    # Save the combined dataset
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = f'allData_updated_{timestamp}.csv'
-    combined_df.to_csv(output_file, index=False)
+    # Append the records whose Date, Area, latitude, longitude are not in the dataset yet
+    index = KeyIndex(existing_file)
+    try:
+        print(f"Checking {len(weather_clean)} records against {len(index)} known records...")
+        appended = index.append(weather_clean)
+    finally:
+        index.close()
     
     print(f"\n🎉 Data merge complete!")
-    print(f"Combined dataset saved to: {output_file}")
-    print(f"Total records: {len(combined_df)}")
-    print(f"Original records: {len(existing_df)}")
-    print(f"New records: {len(weather_clean)}")
-    
-    # Show sample of the combined data
-    print(f"\nSample of combined data:")
-    print(combined_df[['Date', 'Area', 'tempC', 'humidity', 'precipMM', 'windspeedKmph', 'Dangerous']].head(10))
+    print(f"Appended {appended} new records to {existing_file}")
+    print(f"Skipped {len(weather_clean) - appended} records already in the dataset")
     
-    # Show statistics
-    print(f"\nDataset Statistics:")
-    print(f"Dangerous avalanches: {combined_df['Dangerous'].sum()}")
-    print(f"Safe avalanches: {(~combined_df['Dangerous']).sum()}")
-    print(f"Date range: {combined_df['Date'].min()} to {combined_df['Date'].max()}")
+    # Show sample of the new data
+    print(f"\nSample of merged data:")
+    print(weather_clean[['Date', 'Area', 'tempC', 'humidity', 'precipMM', 'windspeedKmph', 'Dangerous']].head(10))
     
-    return output_file
+    return existing_file
 
 if __name__ == "__main__":
-    merge_weather_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Merge avalanche records with weather into the dataset')
+    parser.add_argument('weather_file', nargs='?', default='avalanches_with_weather_20251015_100341.csv',
+                        help='Output of weather_fetcher_openmeteo.py')
+    parser.add_argument('--existing', default='../allData.csv', help='Dataset to merge into')
+    args = parser.parse_args()
+    merge_weather_data(args.weather_file, args.existing)
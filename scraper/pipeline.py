@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Refresh the dataset in one command: scrape -> enrich -> weather -> merge.
+
+Every stage is a generator over batches of listing pages and runs in its own
+thread, handing batches on through a small bounded queue. New pages are
+scraped while earlier ones are enriched and fetched, and only a few batches
+are in memory at any time. No intermediate CSVs are written.
+
+After a batch is merged, the checkpoint file records the last page whose
+records reached the dataset, so an interrupted run resumes after it. Only
+rows whose key is not in the dataset's key index (key_index.py) are appended
+to it.
+
+    python pipeline.py
+    python pipeline.py --dataset ../allData.csv --full
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from key_index import KeyIndex
+from merge_new_data import TEXT_COLUMNS, build_coordinate_lookup, enrich_records
+from merge_weather_data import to_dataset_rows
+from scraper_improved import load_known_keys, scrape_batches
+from weather_cache import WeatherCache
+from weather_fetcher_openmeteo import OpenMeteoWeatherFetcher
+
+CHECKPOINT_FILE = 'pipeline_checkpoint.json'
+
+# Batches waiting between two stages
+BUFFER_SIZE = 2
+
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, error):
+        self.error = error
+
+
+def buffered(stage, maxsize=BUFFER_SIZE):
+    """Run a generator stage in its own thread, yielding its items through a bounded queue"""
+    items = queue.Queue(maxsize)
+
+    def produce():
+        try:
+            for item in stage:
+                items.put(item)
+        except Exception as e:
+            items.put(_StageError(e))
+        finally:
+            items.put(_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item = items.get()
+        if item is _DONE:
+            return
+        if isinstance(item, _StageError):
+            raise item.error
+        yield item
+
+
+def enrich_stage(batches, lookup):
+    """Add coordinates to scraped records, dropping those at unknown locations"""
+    for page, scraped in batches:
+        if scraped.empty:
+            yield page, scraped
+            continue
+        enhanced, unmatched = enrich_records(scraped, lookup)
+        if len(unmatched):
+            print(f"No coordinates for {int(unmatched.sum())} records at {', '.join(map(str, unmatched.index))}")
+        yield page, enhanced
+
+
+def weather_stage(batches, fetcher, delay):
+    """Attach each record's daily weather"""
+    for page, records in batches:
+        if records.empty:
+            yield page, records
+            continue
+        yield page, fetcher.fetch_weather_for_avalanches(records, delay=delay)
+
+
+def merge_stage(batches, index, columns, checkpoint, checkpoint_file):
+    """Append new rows to the dataset and checkpoint the pages that are done"""
+    for page, records in batches:
+        appended = 0
+        if not records.empty:
+            appended = index.append(to_dataset_rows(records, columns))
+        checkpoint['next_page'] = page + 1
+        checkpoint['appended'] += appended
+        save_checkpoint(checkpoint, checkpoint_file)
+        print(f"Pages up to {page + 1}: {appended} new rows added to {index.dataset_file}")
+        yield page, appended
+
+
+def load_checkpoint(checkpoint_file):
+    if not os.path.exists(checkpoint_file):
+        return None
+    with open(checkpoint_file) as infile:
+        return json.load(infile)
+
+
+def save_checkpoint(checkpoint, checkpoint_file):
+    # Replace atomically so an interrupted write never leaves a broken checkpoint
+    tmp_file = f'{checkpoint_file}.tmp'
+    with open(tmp_file, 'w') as outfile:
+        json.dump(checkpoint, outfile, indent=2)
+    os.replace(tmp_file, checkpoint_file)
+
+
+def run_pipeline(dataset_file='../allData.csv', full=False, checkpoint_file=CHECKPOINT_FILE,
+                 restart=False, max_workers=8, weather_workers=4, delay=0.1,
+                 cache_file='weather_cache.sqlite', parser=None):
+    """
+    Scrape new avalanches and append them, with weather, to the dataset
+
+    Args:
+        dataset_file (str): Canonical dataset CSV, updated in place
+        full (bool): Scrape the whole history instead of stopping at known records
+        checkpoint_file (str): Progress file used to resume an interrupted run
+        restart (bool): Ignore an existing checkpoint
+        max_workers (int): Listing pages fetched concurrently
+        weather_workers (int): Weather requests made concurrently
+        delay (float): Minimum average spacing between weather API calls in seconds
+        cache_file (str): SQLite weather cache
+        parser (str): BeautifulSoup parser
+
+    Returns:
+        int: Number of rows appended to the dataset
+    """
+    checkpoint = None if restart else load_checkpoint(checkpoint_file)
+    if checkpoint and (checkpoint.get('dataset') != dataset_file or checkpoint.get('full') != full):
+        print(f"Ignoring {checkpoint_file}, it belongs to a run with different settings")
+        checkpoint = None
+    if checkpoint:
+        print(f"Resuming run from {checkpoint['started_at']} at page {checkpoint['next_page'] + 1}")
+    else:
+        checkpoint = {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'dataset': dataset_file,
+            'full': full,
+            'next_page': 0,
+            'appended': 0,
+        }
+
+    existing = pd.read_csv(dataset_file, nrows=0)
+    lookup = build_coordinate_lookup(pd.read_csv(dataset_file, usecols=['Area', 'longitude', 'latitude', 'altitude'],
+                                                 dtype=TEXT_COLUMNS))
+    known_keys = None if full else load_known_keys(dataset_file)
+
+    index = KeyIndex(dataset_file)
+    cache = WeatherCache(cache_file)
+    fetcher = OpenMeteoWeatherFetcher(max_workers=weather_workers, cache=cache)
+    try:
+        scraped = buffered(scrape_batches(known_keys, max_workers, parser, start_page=checkpoint['next_page']))
+        enriched = buffered(enrich_stage(scraped, lookup))
+        with_weather = buffered(weather_stage(enriched, fetcher, delay))
+        for _ in merge_stage(with_weather, index, existing.columns, checkpoint, checkpoint_file):
+            pass
+    finally:
+        index.close()
+        stats = cache.stats()
+        print(f"Weather cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_ratio']:.0%} hit ratio)")
+        cache.close()
+
+    # Finished, the next run starts from the newest page again
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    print(f"Added {checkpoint['appended']} new records to {dataset_file}")
+    return checkpoint['appended']
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Scrape, enrich, add weather and merge new avalanches')
+    arg_parser.add_argument('--dataset', default='../allData.csv', help='Dataset to append new records to')
+    arg_parser.add_argument('--full', action='store_true',
+                            help='Scrape the whole history instead of only records missing from --dataset')
+    arg_parser.add_argument('--checkpoint', default=CHECKPOINT_FILE, help='Progress file for resuming')
+    arg_parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start over')
+    arg_parser.add_argument('--workers', type=int, default=8, help='Listing pages fetched concurrently')
+    arg_parser.add_argument('--weather-workers', type=int, default=4, help='Weather requests made concurrently')
+    arg_parser.add_argument('--delay', type=float, default=0.1, help='Minimum spacing between weather requests')
+    arg_parser.add_argument('--cache', default='weather_cache.sqlite', help='Weather cache database')
+    arg_parser.add_argument('--parser', default=None, help='BeautifulSoup parser (default: lxml if installed)')
+    args = arg_parser.parse_args()
+
+    run_pipeline(args.dataset, args.full, args.checkpoint, args.restart, args.workers,
+                 args.weather_workers, args.delay, args.cache, args.parser)
@@ -1,93 +1,263 @@
 #!/usr/bin/env python3
 
+import argparse
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
-import os
 from datetime import datetime
 
-def scrape_avalanche_data():
-    """Scrape avalanche data from Utah Avalalanche Center"""
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/71.0.3578.98 Safari/537.36"
-    }
-    
-    all_data = []
-    
-    print("Starting avalanche data scraping...")
-    
-    for i in range(54):  # Scrape all pages
-        if i == 0:
-            URL = 'https://utahavalanchecenter.org/avalanches/salt-lake'
-        else:
-            URL = f'https://utahavalanchecenter.org/avalanches/salt-lake?page={i}'
-        
-        print(f"Scraping page {i+1}/54...")
-        
-        try:
-            page = requests.get(URL, headers=headers, timeout=10)
-            page.raise_for_status()
-        except requests.RequestException as e:
-            print(f"Error fetching page {i+1}: {e}")
-            continue
-            
-        soup = BeautifulSoup(page.content, 'html.parser')
-        tables = soup.find_all('table')
-        
-        if not tables:
+BASE_URL = 'https://utahavalanchecenter.org/avalanches/salt-lake'
+# Most listing pages a scrape fetches, in case the end of the listing is not recognised
+MAX_PAGES = 500
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/71.0.3578.98 Safari/537.36"
+}
+
+
+def default_parser():
+    """Use lxml when it is installed, it parses much faster than html.parser"""
+    try:
+        import lxml  # noqa: F401
+        return 'lxml'
+    except ImportError:
+        return 'html.parser'
+
+
+def make_session(max_workers):
+    """Session whose connection pool can serve every worker thread"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def page_url(i):
+    return BASE_URL if i == 0 else f'{BASE_URL}?page={i}'
+
+
+def fetch_page(session, i):
+    """Fetch one listing page, returning its content or None on failure"""
+    try:
+        page = session.get(page_url(i), timeout=10)
+        page.raise_for_status()
+        return page.content
+    except requests.RequestException as e:
+        print(f"Error fetching page {i+1}: {e}")
+        return None
+
+
+def discover_page_count(soup):
+    """Read the number of listing pages from the pager on the first page, None without a pager"""
+    last = soup.select_one('li.pager__item--last a, li.pager-last a')
+    links = [last] if last is not None else soup.select('.pager a, nav.pager a, ul.pager a')
+    pages = [
+        int(match.group(1))
+        for link in links
+        for match in [re.search(r'[?&]page=(\d+)', link.get('href', ''))]
+        if match
+    ]
+    return max(pages) + 1 if pages else None
+
+
+def parse_page(soup):
+    """
+    Extract the avalanche table from a listing page
+
+    Returns:
+        tuple: (column names, list of row values)
+    """
+    tables = soup.find_all('table')
+    if not tables:
+        return [], []
+
+    table = tables[0]
+
+    # Extract column names
+    column_names = []
+    header_row = table.find('tr')
+    if header_row:
+        th_tags = header_row.find_all('th')
+        column_names = [th.get_text().strip() for th in th_tags]
+
+    # Extract data rows
+    rows = []
+    for row in table.find_all('tr')[1:]:  # Skip header row
+        columns = row.find_all('td')
+        if len(columns) > 0:
+            row_data = []
+            for index, column in enumerate(columns):
+                text = column.get_text().strip()
+
+                # Clean up specific columns
+                if "Avalanche: " in text:
+                    text = text[11:]  # Remove "Avalanche: " prefix
+                elif index == 4 or index == 5:
+                    text = text[:-1] if text.endswith('°') else text  # Remove degree symbol
+
+                row_data.append(text)
+
+            rows.append(row_data)
+
+    return column_names, rows
+
+
+def record_key(date, location):
+    """Normalized (date, location) key used to recognise already known records"""
+    parsed = pd.to_datetime(date, errors='coerce')
+    return (parsed.strftime('%Y-%m-%d') if pd.notna(parsed) else str(date), str(location).strip())
+
+
+def load_known_keys(dataset_file):
+    """Keys of the records already in a dataset (Date + Area columns)"""
+    if not dataset_file or not os.path.exists(dataset_file):
+        return set()
+    existing = pd.read_csv(dataset_file, usecols=['Date', 'Area'])
+    dates = pd.to_datetime(existing['Date'], format='mixed', errors='coerce').dt.strftime('%Y-%m-%d')
+    dates = dates.fillna(existing['Date'].astype(str))
+    return set(zip(dates, existing['Area'].astype(str).str.strip()))
+
+
+def scrape_batches(known_keys=None, max_workers=8, parser=None, start_page=0, max_pages=MAX_PAGES):
+    """
+    Scrape the listing a batch of pages at a time
+
+    Args:
+        known_keys (set): (date, location) keys already in the dataset. When given,
+            only new records are kept and paging stops at the first page that
+            contains a known record (the listing is newest first).
+        max_workers (int): Pages fetched concurrently
+        parser (str): BeautifulSoup parser, defaults to lxml when available
+        start_page (int): First page to keep records from, to resume a run
+        max_pages (int): Most pages to fetch
+
+    Yields:
+        tuple: (index of the last page in the batch, DataFrame of its records)
+    """
+    parser = parser or default_parser()
+    session = make_session(max_workers)
+    incremental = known_keys is not None
+    column_names = []
+
+    print(f"Starting avalanche data scraping (parser: {parser})...")
+
+    content = fetch_page(session, 0)
+    if content is None:
+        return
+    first_page = BeautifulSoup(content, parser)
+    page_count = discover_page_count(first_page)
+    if page_count is None:
+        # The pager markup changed; don't let a full scrape silently stop at page 1
+        print(f"WARNING: no pager found on the first page, scraping until a page has no new records "
+              f"(at most {max_pages} pages)")
+    else:
+        print(f"Found {page_count} listing pages")
+    # Without a pager, the first page without records ends the listing. A page
+    # repeating the previous one always does: sites often serve the last page
+    # again for any page number past the end
+    end = page_count
+    previous = None
+
+    def last():
+        """Index past the last page to fetch"""
+        return max_pages if end is None else min(end, max_pages)
+
+    def process(i, soup, batch_rows):
+        """Add a page's rows, returning True if it contained an already known record"""
+        nonlocal column_names, end, previous
+        names, rows = parse_page(soup)
+        repeated = bool(rows) and previous == (i - 1, rows)
+        previous = (i, rows)
+        if repeated:
+            print(f"Page {i+1} repeats page {i}, stopping")
+            end = i if end is None else min(end, i)
+            return False
+        if not rows:
             print(f"No tables found on page {i+1}")
-            continue
-            
-        table = tables[0]
-        
-        # Extract column names
-        column_names = []
-        header_row = table.find('tr')
-        if header_row:
-            th_tags = header_row.find_all('th')
-            column_names = [th.get_text().strip() for th in th_tags]
-        
-        # Extract data rows
-        rows = table.find_all('tr')[1:]  # Skip header row
-        
-        for row in rows:
-            columns = row.find_all('td')
-            if len(columns) > 0:
-                row_data = []
-                for index, column in enumerate(columns):
-                    text = column.get_text().strip()
-                    
-                    # Clean up specific columns
-                    if "Avalanche: " in text:
-                        text = text[11:]  # Remove "Avalanche: " prefix
-                    elif index == 4 or index == 5:
-                        text = text[:-1] if text.endswith('°') else text  # Remove degree symbol
-                    
-                    row_data.append(text)
-                
-                if len(row_data) > 0:
-                    all_data.append(row_data)
-    
-    print(f"Scraped {len(all_data)} avalanche records")
-    
+            if page_count is None:
+                end = i if end is None else min(end, i)
+            return False
+        column_names = column_names or names
+        if not incremental:
+            batch_rows.extend(rows)
+            return False
+        new_rows = [row for row in rows if record_key(row[0], row[1]) not in known_keys]
+        batch_rows.extend(new_rows)
+        return len(new_rows) < len(rows)
+
+    def frame(rows):
+        return pd.DataFrame(rows, columns=column_names or None)
+
+    reached_known = False
+    if start_page == 0:
+        rows = []
+        reached_known = process(0, first_page, rows)
+        yield 0, frame(rows)
+        start_page = 1
+
+    # Full scrapes fetch many pages at once, incremental ones a worker's worth at a time
+    batch_size = max_workers if incremental else max_workers * 4
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        start = start_page
+        while start < last() and not reached_known:
+            batch = range(start, min(start + batch_size, last()))
+            print(f"Scraping pages {batch.start + 1}-{batch.stop}/{end or '?'}...")
+            rows = []
+            contents = executor.map(lambda i: fetch_page(session, i), batch)
+            for i, content in zip(batch, contents):
+                # Pages of the batch past an end found in it
+                if end is not None and i >= end:
+                    continue
+                if content is not None and process(i, BeautifulSoup(content, parser), rows):
+                    reached_known = True
+            yield batch.stop - 1, frame(rows)
+            start = batch.stop
+
+    if not reached_known and start >= max_pages and (end is None or end > max_pages):
+        print(f"WARNING: stopped after {max_pages} pages, raise --max-pages to scrape further")
+
+    if incremental and reached_known:
+        print("Reached records already in the dataset, stopping")
+
+
+def scrape_avalanche_data(known_keys=None, max_workers=8, parser=None, max_pages=MAX_PAGES):
+    """
+    Scrape avalanche data from Utah Avalalanche Center
+
+    Args:
+        known_keys (set): (date, location) keys already in the dataset, see scrape_batches
+        max_workers (int): Pages fetched concurrently
+        parser (str): BeautifulSoup parser, defaults to lxml when available
+        max_pages (int): Most pages to fetch
+    """
+    incremental = known_keys is not None
+    frames = [batch for _, batch in scrape_batches(known_keys, max_workers, parser, max_pages=max_pages) if not batch.empty]
+    total = sum(len(batch) for batch in frames)
+    print(f"Scraped {total} {'new ' if incremental else ''}avalanche records")
+
     # Create DataFrame
-    if all_data:
-        df = pd.DataFrame(all_data, columns=column_names)
-        
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+
         # Remove duplicates based on all columns
         initial_count = len(df)
         df = df.drop_duplicates()
         final_count = len(df)
-        
+
         if initial_count != final_count:
             print(f"Removed {initial_count - final_count} duplicate records")
-        
+
         # Save to CSV
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_file = f'avalanches_scraped_{timestamp}.csv'
         df.to_csv(output_file, index=False)
-        
+
         print(f"Saved {final_count} unique records to {output_file}")
         return output_file
     else:
@@ -95,7 +265,19 @@ def scrape_avalanche_data():
         return None
 
 if __name__ == "__main__":
-    output_file = scrape_avalanche_data()
+    arg_parser = argparse.ArgumentParser(description='Scrape avalanche records from the Utah Avalanche Center')
+    arg_parser.add_argument('--full', action='store_true',
+                            help='Scrape the whole history instead of only records missing from --dataset')
+    arg_parser.add_argument('--dataset', default='../allData.csv',
+                            help='Existing dataset used to detect already scraped records')
+    arg_parser.add_argument('--workers', type=int, default=8, help='Pages fetched concurrently')
+    arg_parser.add_argument('--parser', default=None, help='BeautifulSoup parser (default: lxml if installed)')
+    arg_parser.add_argument('--max-pages', type=int, default=MAX_PAGES, help='Most listing pages to fetch')
+    args = arg_parser.parse_args()
+
+    known_keys = None if args.full else load_known_keys(args.dataset)
+    output_file = scrape_avalanche_data(known_keys, max_workers=args.workers, parser=args.parser,
+                                        max_pages=args.max_pages)
     if output_file:
         print(f"\nScraping complete! Output saved to: {output_file}")
     else:
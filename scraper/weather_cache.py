@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import json
+import sqlite3
+import threading
+
+
+class WeatherCache:
+    """
+    Persistent SQLite cache of daily archive weather.
+
+    Published archive data never changes, so each day is stored once, keyed on
+    the coordinates rounded to the weather model grid plus the date. Nearby
+    coordinates that fall in the same grid cell share entries.
+    """
+
+    def __init__(self, path='weather_cache.sqlite', grid=0.1):
+        """
+        Args:
+            path (str): SQLite database file
+            grid (float): Grid spacing in degrees that coordinates are rounded to
+        """
+        self.path = path
+        self.grid = grid
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS daily_weather ('
+            ' lat_cell INTEGER NOT NULL,'
+            ' lon_cell INTEGER NOT NULL,'
+            ' date TEXT NOT NULL,'
+            ' daily TEXT NOT NULL,'
+            ' PRIMARY KEY (lat_cell, lon_cell, date))'
+        )
+        self.connection.commit()
+
+    def _cell(self, lat, lon):
+        return round(float(lat) / self.grid), round(float(lon) / self.grid)
+
+    def get_many(self, lat, lon, dates):
+        """
+        Look up cached days for one location
+
+        Returns:
+            dict: Date string -> daily values, for the dates that were cached
+        """
+        lat_cell, lon_cell = self._cell(lat, lon)
+        dates = list(dates)
+        if not dates:
+            return {}
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT date, daily FROM daily_weather'
+                ' WHERE lat_cell = ? AND lon_cell = ? AND date BETWEEN ? AND ?',
+                (lat_cell, lon_cell, min(dates), max(dates)),
+            ).fetchall()
+            wanted = set(dates)
+            found = {date: json.loads(daily) for date, daily in rows if date in wanted}
+            self.hits += len(found)
+            self.misses += len(wanted) - len(found)
+        return found
+
+    def put_many(self, lat, lon, days):
+        """
+        Store daily values for one location
+
+        Args:
+            days (dict): Date string -> daily values
+        """
+        lat_cell, lon_cell = self._cell(lat, lon)
+        with self.lock:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO daily_weather VALUES (?, ?, ?, ?)',
+                [(lat_cell, lon_cell, date, json.dumps(daily)) for date, daily in days.items()],
+            )
+            self.connection.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
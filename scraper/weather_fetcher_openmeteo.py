@@ -4,167 +4,308 @@ import requests
 import pandas as pd
 import time
 import os
-from datetime import datetime, timedelta
-import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from weather_cache import WeatherCache
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how fast requests are started"""
+
+    def __init__(self, rate, capacity=1):
+        """
+        Args:
+            rate (float): Tokens added per second, None or 0 for no limit
+            capacity (int): Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def parse_dates(dates):
+    """Parse MM/DD/YYYY or YYYY-MM-DD dates, returning NaT for anything else"""
+    dates = dates.astype(str)
+    parsed = pd.to_datetime(dates, format='%m/%d/%Y', errors='coerce')
+    return parsed.fillna(pd.to_datetime(dates, format='%Y-%m-%d', errors='coerce'))
+
+
+def date_runs(dates, max_gap_days=30, max_span_days=366):
+    """
+    Split dates into (start, end) ranges worth fetching in one request
+
+    Dates closer than max_gap_days are fetched together (the few extra days in
+    between are cheaper than another round trip), and no range spans more than
+    max_span_days.
+    """
+    runs = []
+    for date in sorted(set(dates)):
+        if runs:
+            start, end = runs[-1]
+            if (date - end).days <= max_gap_days and (date - start).days < max_span_days:
+                runs[-1] = (start, date)
+                continue
+        runs.append((date, date))
+    return runs
+
 
 class OpenMeteoWeatherFetcher:
-    def __init__(self):
-        """Initialize the weather data fetcher with Open-Meteo API (no API key required!)"""
-        self.base_url = "https://archive-api.open-meteo.com/v1/archive"
-        self.session = requests.Session()
-        
-    def get_historical_weather(self, lat, lon, date, units='metric'):
+    DAILY_VARIABLES = [
+        'temperature_2m_max',
+        'temperature_2m_min',
+        'precipitation_sum',
+        'windspeed_10m_max',
+        'winddirection_10m_dominant'
+    ]
+
+    def __init__(self, base_url=None, max_workers=4, cache=None):
         """
-        Get historical weather data for a specific location and date
+        Initialize the weather data fetcher with Open-Meteo API (no API key required!)
         
         Args:
-            lat (float): Latitude
-            lon (float): Longitude  
-            date (str): Date in YYYY-MM-DD format
-            units (str): Temperature units ('metric', 'imperial')
+            base_url (str): Archive API URL, override to point at a local stub server
+            max_workers (int): Concurrent requests when fetching many locations
+            cache (WeatherCache): Persistent cache of already fetched days
+        """
+        self.base_url = base_url or os.environ.get(
+            'OPEN_METEO_ARCHIVE_URL', "https://archive-api.open-meteo.com/v1/archive")
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.rate_limiter = TokenBucket(None)
+        self.cache = cache
+    
+    def _build_weather_record(self, daily, i, lat, lon, date):
+        """Build one day's weather record from the daily arrays of an archive response"""
+        def value(key, default=None):
+            values = daily.get(key)
+            return values[i] if values and i < len(values) else default
+        
+        weather_data = {
+            'date': date,
+            'latitude': lat,
+            'longitude': lon,
+            'maxtempC': value('temperature_2m_max'),
+            'mintempC': value('temperature_2m_min'),
+            'tempC': value('temperature_2m_max'),  # Use max temp as current temp
+            'precipMM': value('precipitation_sum', 0) or 0,
+            'windspeedKmph': value('windspeed_10m_max'),
+            'winddirDegree': value('winddirection_10m_dominant'),
+            'pressure': 1013.25,  # Default pressure
+            'cloudcover': 50.0,  # Default cloud cover
+            'uvIndex': 5.0,  # Default UV index
+            'sunrise': '06:00',  # Default sunrise
+            'sunset': '18:00',  # Default sunset
+        }
+        
+        # Set default values for missing hourly data
+        weather_data.update({
+            'humidity': 50.0,  # Default humidity
+            'visibility': 10.0,  # Default visibility
+        })
+        
+        # Calculate additional fields
+        if weather_data['maxtempC'] and weather_data['mintempC']:
+            weather_data['HeatIndexC'] = weather_data['maxtempC']
+            weather_data['WindChillC'] = weather_data['mintempC']
+        else:
+            weather_data['HeatIndexC'] = weather_data['tempC']
+            weather_data['WindChillC'] = weather_data['tempC']
+        
+        weather_data['WindGustKmph'] = weather_data['windspeedKmph']  # Approximate
+        weather_data['DewPointC'] = weather_data['tempC']  # Approximate
+        weather_data['FeelsLikeC'] = weather_data['tempC']  # Approximate
+        
+        # Calculate sun hours from sunrise/sunset
+        if weather_data['sunrise'] and weather_data['sunset']:
+            try:
+                sunrise = datetime.fromisoformat(weather_data['sunrise'].replace('Z', '+00:00'))
+                sunset = datetime.fromisoformat(weather_data['sunset'].replace('Z', '+00:00'))
+                sun_hours = (sunset - sunrise).total_seconds() / 3600
+                weather_data['sunHour'] = round(sun_hours, 1)
+            except:
+                weather_data['sunHour'] = 12.0  # Default
+        else:
+            weather_data['sunHour'] = 12.0  # Default
+        
+        return weather_data
+    
+    def _fetch_daily(self, lat, lon, start_date, end_date):
+        """
+        Request the daily archive values for a date range
         
         Returns:
-            dict: Weather data or None if failed
+            dict: Date string -> {daily variable: value}, or None if the request failed
         """
         try:
             params = {
                 'latitude': lat,
                 'longitude': lon,
-                'start_date': date,
-                'end_date': date,
-                'daily': [
-                    'temperature_2m_max',
-                    'temperature_2m_min',
-                    'precipitation_sum',
-                    'windspeed_10m_max',
-                    'winddirection_10m_dominant'
-                ],
+                'start_date': start_date,
+                'end_date': end_date,
+                'daily': self.DAILY_VARIABLES,
                 'timezone': 'auto'
             }
             
+            self.rate_limiter.acquire()
             response = self.session.get(self.base_url, params=params, timeout=10)
             response.raise_for_status()
             
-            data = response.json()
-            
-            # Extract relevant weather data
-            if 'daily' in data and len(data['daily']['time']) > 0:
-                daily = data['daily']
-                hourly = data.get('hourly', {})
-                
-                # Get daily values
-                weather_data = {
-                    'date': date,
-                    'latitude': lat,
-                    'longitude': lon,
-                    'maxtempC': daily.get('temperature_2m_max', [None])[0],
-                    'mintempC': daily.get('temperature_2m_min', [None])[0],
-                    'tempC': daily.get('temperature_2m_max', [None])[0],  # Use max temp as current temp
-                    'precipMM': daily.get('precipitation_sum', [0])[0] or 0,
-                    'windspeedKmph': daily.get('windspeed_10m_max', [None])[0],
-                    'winddirDegree': daily.get('winddirection_10m_dominant', [None])[0],
-                    'pressure': 1013.25,  # Default pressure
-                    'cloudcover': 50.0,  # Default cloud cover
-                    'uvIndex': 5.0,  # Default UV index
-                    'sunrise': '06:00',  # Default sunrise
-                    'sunset': '18:00',  # Default sunset
+            daily = response.json().get('daily', {})
+            return {
+                date: {
+                    key: daily[key][i] if i < len(daily.get(key) or []) else None
+                    for key in self.DAILY_VARIABLES
                 }
-                
-                # Set default values for missing hourly data
-                weather_data.update({
-                    'humidity': 50.0,  # Default humidity
-                    'visibility': 10.0,  # Default visibility
-                })
-                
-                # Calculate additional fields
-                if weather_data['maxtempC'] and weather_data['mintempC']:
-                    weather_data['HeatIndexC'] = weather_data['maxtempC']
-                    weather_data['WindChillC'] = weather_data['mintempC']
-                else:
-                    weather_data['HeatIndexC'] = weather_data['tempC']
-                    weather_data['WindChillC'] = weather_data['tempC']
-                
-                weather_data['WindGustKmph'] = weather_data['windspeedKmph']  # Approximate
-                weather_data['DewPointC'] = weather_data['tempC']  # Approximate
-                weather_data['FeelsLikeC'] = weather_data['tempC']  # Approximate
-                
-                # Calculate sun hours from sunrise/sunset
-                if weather_data['sunrise'] and weather_data['sunset']:
-                    try:
-                        sunrise = datetime.fromisoformat(weather_data['sunrise'].replace('Z', '+00:00'))
-                        sunset = datetime.fromisoformat(weather_data['sunset'].replace('Z', '+00:00'))
-                        sun_hours = (sunset - sunrise).total_seconds() / 3600
-                        weather_data['sunHour'] = round(sun_hours, 1)
-                    except:
-                        weather_data['sunHour'] = 12.0  # Default
-                else:
-                    weather_data['sunHour'] = 12.0  # Default
-                
-                return weather_data
+                for i, date in enumerate(daily.get('time', []))
+            }
             
         except requests.exceptions.RequestException as e:
-            print(f"API request failed for {lat}, {lon} on {date}: {e}")
+            print(f"API request failed for {lat}, {lon} from {start_date} to {end_date}: {e}")
             return None
         except Exception as e:
-            print(f"Error processing weather data for {lat}, {lon} on {date}: {e}")
+            print(f"Error processing weather data for {lat}, {lon} from {start_date} to {end_date}: {e}")
             return None
     
-    def fetch_weather_for_avalanches(self, avalanche_df, delay=0.1):
+    def get_historical_weather_range(self, lat, lon, start_date, end_date):
+        """
+        Get historical weather data for every day of a date range in one request
+        
+        Days already in the cache are not requested again.
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            start_date (str): First date in YYYY-MM-DD format
+            end_date (str): Last date in YYYY-MM-DD format
+        
+        Returns:
+            dict: Date string -> weather data, or None if the request failed
+        """
+        days = {}
+        missing = [start_date, end_date]
+        if self.cache is not None:
+            dates = pd.date_range(start_date, end_date).strftime('%Y-%m-%d').tolist()
+            days = self.cache.get_many(lat, lon, dates)
+            missing = [date for date in dates if date not in days]
+        
+        if missing:
+            fetched = self._fetch_daily(lat, lon, missing[0], missing[-1])
+            if fetched is None and not days:
+                return None
+            fetched = fetched or {}
+            if self.cache is not None:
+                # Days that are not published yet come back empty, don't cache those
+                self.cache.put_many(lat, lon, {
+                    date: values for date, values in fetched.items()
+                    if any(value is not None for value in values.values())
+                })
+            days.update(fetched)
+        
+        return {
+            date: self._build_weather_record({key: [value] for key, value in values.items()}, 0, lat, lon, date)
+            for date, values in sorted(days.items())
+        }
+    
+    def get_historical_weather(self, lat, lon, date, units='metric'):
+        """
+        Get historical weather data for a specific location and date
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude  
+            date (str): Date in YYYY-MM-DD format
+            units (str): Temperature units ('metric', 'imperial')
+        
+        Returns:
+            dict: Weather data or None if failed
+        """
+        weather = self.get_historical_weather_range(lat, lon, date, date)
+        return weather.get(date) if weather else None
+    
+    def fetch_weather_for_avalanches(self, avalanche_df, delay=0.1, max_workers=None):
         """
         Fetch weather data for all avalanche records
         
+        Records are grouped by coordinates and each group's dates are fetched as
+        a few contiguous ranges, with the groups running concurrently.
+        
         Args:
             avalanche_df (pd.DataFrame): DataFrame with avalanche data
-            delay (float): Delay between API calls in seconds (Open-Meteo has no rate limits, but be respectful)
+            delay (float): Minimum average spacing between API calls in seconds (Open-Meteo has no rate limits, but be respectful)
+            max_workers (int): Concurrent requests, defaults to the fetcher's max_workers
         
         Returns:
             pd.DataFrame: DataFrame with avalanche data + weather data
         """
-        weather_records = []
         total_records = len(avalanche_df)
         
         print(f"Fetching weather data for {total_records} avalanche records...")
         print("Using Open-Meteo API (free, no rate limits!)")
         
-        for idx, row in avalanche_df.iterrows():
-            if idx % 50 == 0:
-                print(f"Processing record {idx + 1}/{total_records}")
-            
-            # Skip if no coordinates
-            if pd.isna(row['latitude']) or pd.isna(row['longitude']):
-                print(f"Skipping record {idx}: No coordinates")
-                continue
-            
-            # Parse date
-            try:
-                if '/' in str(row['Date']):
-                    # Handle MM/DD/YYYY format
-                    date_obj = datetime.strptime(str(row['Date']), '%m/%d/%Y')
-                else:
-                    # Handle other formats
-                    date_obj = datetime.strptime(str(row['Date']), '%Y-%m-%d')
-                
-                date_str = date_obj.strftime('%Y-%m-%d')
-            except:
-                print(f"Skipping record {idx}: Invalid date format: {row['Date']}")
+        self.rate_limiter = TokenBucket(1 / delay if delay else None)
+        
+        dates = parse_dates(avalanche_df['Date'])
+        has_coords = avalanche_df['latitude'].notna() & avalanche_df['longitude'].notna()
+        for idx in avalanche_df.index[~has_coords]:
+            print(f"Skipping record {idx}: No coordinates")
+        for idx in avalanche_df.index[has_coords & dates.isna()]:
+            print(f"Skipping record {idx}: Invalid date format: {avalanche_df.at[idx, 'Date']}")
+        valid = has_coords & dates.notna()
+        
+        # One task per contiguous date range at each distinct coordinate
+        tasks = []
+        for (lat, lon), group_dates in dates[valid].groupby(
+                [avalanche_df.loc[valid, 'latitude'], avalanche_df.loc[valid, 'longitude']]):
+            for start, end in date_runs(group_dates):
+                tasks.append((lat, lon, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')))
+        
+        print(f"Fetching {len(tasks)} date ranges for {valid.sum()} records")
+        
+        weather_by_location = {}
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+            futures = {
+                executor.submit(self.get_historical_weather_range, *task): task
+                for task in tasks
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                lat, lon, _, _ = futures[future]
+                weather_by_location.setdefault((lat, lon), {}).update(future.result() or {})
+                if done % 50 == 0:
+                    print(f"Fetched {done}/{len(tasks)} date ranges")
+        
+        weather_records = []
+        records = avalanche_df.to_dict('records')
+        for idx, record, is_valid, date in zip(avalanche_df.index, records, valid, dates):
+            if not is_valid:
                 continue
-            
-            # Fetch weather data
-            weather_data = self.get_historical_weather(
-                row['latitude'], 
-                row['longitude'], 
-                date_str
-            )
-            
+            weather_data = weather_by_location.get(
+                (record['latitude'], record['longitude']), {}).get(date.strftime('%Y-%m-%d'))
             if weather_data:
                 # Combine avalanche and weather data
-                combined_record = {**row.to_dict(), **weather_data}
-                weather_records.append(combined_record)
+                weather_records.append({**record, **weather_data})
             else:
                 print(f"Failed to get weather data for record {idx}")
-            
-            # Small delay to be respectful to the API
-            time.sleep(delay)
         
         print(f"Successfully fetched weather data for {len(weather_records)} records")
         return pd.DataFrame(weather_records)
@@ -189,8 +330,9 @@ def main():
     avalanche_df = pd.read_csv(avalanche_file)
     print(f"Loaded {len(avalanche_df)} avalanche records")
     
-    # Initialize weather fetcher
-    fetcher = OpenMeteoWeatherFetcher()
+    # Initialize weather fetcher, re-runs only fetch days missing from the cache
+    cache = WeatherCache('weather_cache.sqlite')
+    fetcher = OpenMeteoWeatherFetcher(cache=cache)
     
     # Fetch weather data
     combined_df = fetcher.fetch_weather_for_avalanches(avalanche_df, delay=0.1)
@@ -203,6 +345,9 @@ def main():
     print(f"\n🎉 Weather data fetch complete!")
     print(f"Combined data saved to: {output_file}")
     print(f"Records with weather data: {len(combined_df)}")
+    stats = cache.stats()
+    print(f"Weather cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_ratio']:.0%} hit ratio)")
+    cache.close()
     
     # Show sample of the data
     print("\nSample of combined data:")
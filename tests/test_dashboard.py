@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def snapshots():
+    import app
+    from model_snapshot import ModelSnapshot
+
+    predictor = app.AvalanchePredictor()
+    result = {}
+    for slim in (False, True):
+        data, data_hash = predictor.read_data(os.path.join(ROOT, 'allData.csv'), slim=slim)
+        result[slim] = ModelSnapshot(data=data, data_hash=data_hash, feature_columns=predictor.feature_columns)
+    return result
+
+
+@pytest.mark.parametrize('name', ['data', 'locations', 'weather_stats', 'correlation'])
+def test_compact_data_gives_the_same_dashboard(snapshots, name):
+    import app
+
+    build = app.DASHBOARD_RESPONSES[name]
+    assert build(snapshots[True]) == build(snapshots[False])
+
+
+def test_compact_data_trains_on_the_same_features(snapshots):
+    import numpy as np
+
+    columns = snapshots[False].feature_columns
+    slim = snapshots[True].data[columns].to_numpy(dtype='float64')
+    assert np.array_equal(slim, snapshots[False].data[columns].to_numpy(dtype='float64'))
+
+
+def test_compact_frame_keeps_missing_locations_missing():
+    import pandas as pd
+    import columnar_store
+
+    frame = pd.DataFrame({'Area': ['Baldy', None, 'Baldy'], 'Location': [10420, 10420, None]})
+    compact = columnar_store.compact_frame(frame)
+    assert compact['Area'].isna().tolist() == [False, True, False]
+    assert compact['Area'].nunique() == 1
+    assert compact['Location'].isna().tolist() == [False, False, True]
+    assert list(compact['Location'].cat.categories) == ['10420']
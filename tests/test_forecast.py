@@ -0,0 +1,66 @@
+import os
+
+import pandas as pd
+
+import forecast
+from model_snapshot import ModelSnapshot
+
+FEATURES = ['maxtempC', 'mintempC', 'totalSnow_cm', 'tempC', 'windspeedKmph', 'winddirDegree', 'precipMM',
+            'humidity']
+
+
+class StubPredictor:
+    def __init__(self):
+        data = pd.DataFrame({'Area': ['10420', 'Baldy'], 'latitude': [40.6, 40.5], 'longitude': [-111.5, -111.6]})
+        self.snapshot = ModelSnapshot(data=data, data_hash='abc', feature_columns=FEATURES, models={'mlp': None},
+                                      version='v1')
+
+    def predict_many(self, features, model_types, snapshot):
+        return {'mlp': {'prediction': [True] * len(features), 'probability': [0.75] * len(features)}}
+
+
+class CountingSource(forecast.FixtureForecastSource):
+    fetches = 0
+
+    def fetch(self, locations, days):
+        CountingSource.fetches += 1
+        return super().fetch(locations, days)
+
+
+def write_fixture(path):
+    rows = [dict(zip(FEATURES, range(8)), Area=area, date=date)
+            for area in ('10420', 'Baldy') for date in ('2026-01-15', '2026-01-16')]
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def test_processes_share_one_scored_forecast(tmp_path):
+    fixture = tmp_path / 'fixture.csv'
+    write_fixture(fixture)
+    store = tmp_path / 'models'
+    CountingSource.fetches = 0
+    # Two services with their own lock handles stand in for two workers
+    scorer = forecast.ForecastService(StubPredictor(), CountingSource(str(fixture)), days=2, store_dir=str(store))
+    reader = forecast.ForecastService(StubPredictor(), CountingSource(str(fixture)), days=2, store_dir=str(store))
+
+    assert scorer.refresh()
+    assert reader.refresh()
+    assert CountingSource.fetches == 1
+    assert reader.response('mlp', 2).etag == scorer.response('mlp', 2).etag
+    assert reader.forecast['danger']['mlp'].tolist() == [[0.75, 0.75], [0.75, 0.75]]
+    assert sorted(os.listdir(store)) == [os.path.basename(scorer.store_path(scorer._key)), forecast.LOCK_FILE]
+
+
+def test_reader_waits_for_the_scorer(tmp_path):
+    fixture = tmp_path / 'fixture.csv'
+    write_fixture(fixture)
+    store = str(tmp_path / 'models')
+    scorer = forecast.ForecastService(StubPredictor(), forecast.FixtureForecastSource(str(fixture)), store_dir=store)
+    reader = forecast.ForecastService(StubPredictor(), forecast.FixtureForecastSource(str(fixture)), store_dir=store)
+    assert scorer._is_scorer()
+
+    # The scorer has not stored the run yet
+    assert not reader.refresh()
+    assert reader._pending and reader.forecast is None
+    scorer.refresh()
+    assert reader.refresh()
+    assert not reader._pending
@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+
+import metrics
+
+
+def make_registry(directory):
+    registry = metrics.Registry(str(directory))
+    requests = registry.register(metrics.Counter('requests_total', 'Requests', ('route',)))
+    seconds = registry.register(metrics.Histogram('seconds', 'Latency', buckets=(0.1, 1.0)))
+    registry.register(metrics.Gauge('ready', 'Ready', lambda: 1))
+    return registry, requests, seconds
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def write_process(directory, pid, file_id, requests):
+    content = {'id': file_id, 'metrics': {'requests_total': requests, 'seconds': [[[], [0, 2, 0], 1.0]],
+                                          'ready': 1.0}}
+    (directory / f'{pid}.json').write_text(json.dumps(content))
+
+
+def test_render_adds_up_the_values_of_every_process(tmp_path):
+    registry, requests, seconds = make_registry(tmp_path)
+    requests.inc(2, route='/a')
+    seconds.observe(0.05)
+
+    # What a worker that has since exited saved
+    pid = exited_pid()
+    write_process(tmp_path, pid, f'{pid}-1', [[['/a'], 3], [['/b'], 1]])
+
+    text = registry.render()
+    assert 'requests_total{route="/a"} 5' in text
+    assert 'requests_total{route="/b"} 1' in text
+    assert 'seconds_bucket{le="0.1"} 1' in text
+    assert 'seconds_bucket{le="1.0"} 3' in text
+    assert 'seconds_count 3' in text
+    # Gauges of exited processes are dropped
+    assert f'pid="{pid}"' not in text
+    assert text.count('ready{pid=') == 1
+
+
+def test_exited_processes_are_folded_into_one_file(tmp_path):
+    registry, requests, _ = make_registry(tmp_path)
+    requests.inc(route='/a')
+    first, second = exited_pid(), exited_pid()
+    write_process(tmp_path, first, f'{first}-1', [[['/a'], 3]])
+    registry.merge_exited(first)
+    write_process(tmp_path, second, f'{second}-1', [[['/a'], 4]])
+    registry.merge_exited(second)
+
+    assert sorted(os.listdir(tmp_path)) == ['dead.json']
+    assert 'requests_total{route="/a"} 8' in registry.render()
+    assert 'seconds_count 4' in registry.render()
+
+
+def test_a_recycled_pid_does_not_lose_the_exited_counts(tmp_path):
+    registry, _, _ = make_registry(tmp_path)
+    pid = exited_pid()
+    write_process(tmp_path, pid, f'{pid}-1', [[['/a'], 3]])
+    registry.merge_exited(pid)
+    # A new worker with the same pid starts from zero
+    write_process(tmp_path, pid, f'{pid}-2', [[['/a'], 1]])
+    assert 'requests_total{route="/a"} 4' in registry.render()
+
+
+def test_saving_is_skipped_while_nothing_changed(tmp_path):
+    registry, requests, _ = make_registry(tmp_path)
+    requests.inc(route='/a')
+    registry.write()
+    assert registry._updates() == registry._saved
+    requests.inc(route='/a')
+    assert registry._updates() != registry._saved
+
+
+def test_reset_drops_inherited_values(tmp_path):
+    registry, requests, _ = make_registry(tmp_path)
+    requests.inc(route='/a')
+    registry.reset()
+    assert 'requests_total{' not in registry.render()
+
+
+def test_without_directory_only_this_process_is_rendered():
+    registry = metrics.Registry()
+    requests = registry.register(metrics.Counter('requests_total', 'Requests', ('route',)))
+    registry.register(metrics.Gauge('ready', 'Ready', lambda: 1))
+    requests.inc(route='/a')
+    text = registry.render()
+    assert 'requests_total{route="/a"} 1' in text
+    assert 'ready 1.0' in text
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    import app
+    import mlp_search
+    import model_store
+    import weather_store
+
+    # Read the repo's data from any working directory, keep trained models out of the repo
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(app, 'DATA_FILE', os.path.join(ROOT, 'allData.csv'))
+        patch.setattr(weather_store, 'WEATHER_FILE', os.path.join(ROOT, 'all_weather_data.csv'))
+        patch.setattr(mlp_search, 'PARAMS_FILE', os.path.join(ROOT, 'data', 'mlp_params.json'))
+        patch.setattr(model_store, 'ARTIFACT_DIR', str(tmp_path_factory.mktemp('models')))
+        assert app.predictor.ensure_models()
+        yield app.app.test_client()
+
+
+@pytest.fixture(scope='module')
+def predictor(client):
+    import app
+    return app.predictor
+
+
+ROWS = [[10, 0, 0, 10, 5, 100, 0, 50], [-10, -20, 80, -10, 40, 300, 30, 90]]
+
+
+def test_array_rows_are_scored_positionally(client, predictor):
+    response = client.post('/api/predict/batch', json={'rows': ROWS, 'models': ['mlp']})
+    assert response.status_code == 200
+    expected = predictor.predict_many(ROWS, ['mlp'])['mlp']
+    assert response.json['results']['mlp']['probability'] == pytest.approx(expected['probability'])
+    assert response.json['results']['mlp']['prediction'] == expected['prediction']
+
+
+def test_array_rows_must_have_every_feature(client):
+    response = client.post('/api/predict/batch', json={'rows': [ROWS[0], ROWS[1][:5]]})
+    assert response.status_code == 400
+    assert response.json['rows'] == [1]
+
+
+def test_non_numeric_values_are_rejected(client):
+    response = client.post('/api/predict/batch', json={'rows': [{'maxtempC': 'abc', 'tempC': 1}, {'tempC': 2}]})
+    assert response.status_code == 400
+    assert response.json['invalid'] == {'0': ['maxtempC']}
+
+
+def test_missing_features_default_to_zero(client, predictor):
+    response = client.post('/api/predict/batch', json={'rows': [{'tempC': 5}], 'models': ['logistic']})
+    assert response.status_code == 200
+    row = [5 if col == 'tempC' else 0 for col in predictor.feature_columns]
+    expected = predictor.predict_many([row], ['logistic'])['logistic']
+    assert response.json['results']['logistic']['probability'] == pytest.approx(expected['probability'])
+
+
+def test_rows_without_recorded_weather_are_reported(client):
+    rows = [{'location': 0, 'date': '2008-07-01'}, {'location': 'nowhere', 'date': '2008-07-01'}, {'tempC': 1}]
+    response = client.post('/api/predict/batch', json={'rows': rows})
+    # The same status as /api/predict for a location and date without weather
+    assert response.status_code == 404
+    assert response.json['rows'] == [1]
+    single = client.post('/api/predict', json={'location': 'nowhere', 'date': '2008-07-01'})
+    assert single.status_code == response.status_code
+
+
+def test_weather_store_failure_is_a_server_error(client, predictor, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise RuntimeError('Weather data is not available')
+
+    monkeypatch.setattr(predictor, 'weather_features', unavailable)
+    response = client.post('/api/predict/batch', json={'rows': [{'location': 0, 'date': '2008-07-01'}]})
+    assert response.status_code == 500
@@ -0,0 +1,38 @@
+import threading
+
+import app
+from model_snapshot import ModelSnapshot
+
+
+def make_snapshot(version):
+    return ModelSnapshot(data=[], data_hash='abc', models={'mlp': None}, version=version)
+
+
+def test_reload_builds_the_snapshot_without_holding_the_lock(monkeypatch):
+    predictor = app.AvalanchePredictor()
+    lock_free = []
+
+    def load_snapshot(file_path=None, artifact_dir=None):
+        # What a request thread lazily loading the weather store would do
+        def take_lock():
+            if predictor._init_lock.acquire(timeout=1):
+                lock_free.append(True)
+                predictor._init_lock.release()
+
+        thread = threading.Thread(target=take_lock)
+        thread.start()
+        thread.join()
+        return make_snapshot('v2')
+
+    monkeypatch.setattr(predictor, 'load_snapshot', load_snapshot)
+    assert predictor.reload()
+    assert lock_free == [True]
+    assert predictor.snapshot.version == 'v2'
+
+
+def test_reload_keeps_a_snapshot_with_the_same_artifact(monkeypatch):
+    predictor = app.AvalanchePredictor()
+    current = predictor.snapshot = make_snapshot('v1')
+    monkeypatch.setattr(predictor, 'load_snapshot', lambda file_path=None, artifact_dir=None: make_snapshot('v1'))
+    assert not predictor.reload()
+    assert predictor.snapshot is current
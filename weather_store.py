@@ -0,0 +1,149 @@
+"""
+Date-indexed weather store for joining avalanches to daily weather.
+
+Each location's daily series is kept as a dense block of rows, one per
+calendar day from its first to its last date, with missing days filled with
+NaN. All blocks are stacked into one contiguous array, so the row for
+(location, date) is a single offset computation. That gives O(1) lookups
+for one pair and a single fancy-index for thousands of pairs.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+WEATHER_FILE = os.environ.get('WEATHER_FILE', 'all_weather_data.csv')
+
+
+def location_key(value):
+    """Normalize location ids so 1, 1.0 and '1' all refer to the same location"""
+    try:
+        number = float(value)
+        if number.is_integer():
+            return str(int(number))
+    except (TypeError, ValueError):
+        pass
+    return str(value).strip()
+
+
+def _to_days(dates):
+    """Dates (strings, datetimes or datetime64) as integer days since the epoch"""
+    parsed = pd.to_datetime(pd.Series(dates), format='mixed', errors='coerce')
+    days = parsed.to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return np.where(parsed.isna().to_numpy(), np.iinfo(np.int64).min, days)
+
+
+class WeatherStore:
+    def __init__(self, values, columns, locations, offsets, starts, lengths):
+        """
+        Args:
+            values (np.ndarray): Stacked dense daily blocks, total_days x n_columns
+            columns (list): Weather column names
+            locations (list): Location key of each block
+            offsets (np.ndarray): First row of each block in `values`
+            starts (np.ndarray): Day number (since epoch) of each block's first row
+            lengths (np.ndarray): Days in each block
+        """
+        self.values = values
+        self.columns = list(columns)
+        self.locations = pd.Index(locations)
+        self.offsets = offsets
+        self.starts = starts
+        self.lengths = lengths
+
+    @classmethod
+    def from_frame(cls, frame, columns, location_column='Location', date_column='Date'):
+        """Build a store from a long table of daily weather rows"""
+        frame = frame[[location_column, date_column] + list(columns)].copy()
+        frame['_location'] = frame[location_column].map(location_key)
+        frame['_day'] = _to_days(frame[date_column])
+        frame = frame[frame['_day'] != np.iinfo(np.int64).min]
+
+        locations, offsets, starts, lengths, blocks = [], [], [], [], []
+        offset = 0
+        for location, group in frame.groupby('_location', sort=True):
+            start = int(group['_day'].min())
+            length = int(group['_day'].max()) - start + 1
+            block = np.full((length, len(columns)), np.nan)
+            # Later duplicates of a day win, like a dict update
+            block[group['_day'].to_numpy() - start] = group[list(columns)].to_numpy(dtype=np.float64)
+
+            locations.append(location)
+            offsets.append(offset)
+            starts.append(start)
+            lengths.append(length)
+            blocks.append(block)
+            offset += length
+
+        values = np.vstack(blocks) if blocks else np.empty((0, len(columns)))
+        return cls(values, columns, locations, np.array(offsets, dtype=np.int64),
+                   np.array(starts, dtype=np.int64), np.array(lengths, dtype=np.int64))
+
+    @classmethod
+    def from_csv(cls, path=WEATHER_FILE, columns=None, location_column='Location', date_column='Date'):
+        """Build a store from a weather CSV, using every numeric column by default"""
+        frame = pd.read_csv(path)
+        if columns is None:
+            numeric = frame.select_dtypes('number').columns
+            columns = [col for col in numeric if col != location_column and not col.startswith('Unnamed')]
+        return cls.from_frame(frame, columns, location_column, date_column)
+
+    def __contains__(self, location):
+        return location_key(location) in self.locations
+
+    def lookup_many(self, locations, dates, history=0, columns=None):
+        """
+        Weather for many (location, date) pairs at once
+
+        Args:
+            locations: Location id per pair
+            dates: Date per pair
+            history (int): Days of history to include before each date
+            columns (list): Subset of columns to return, defaults to all
+
+        Returns:
+            np.ndarray: n_pairs x (history + 1) x n_columns, where [:, k] is the
+                weather k days before each date. Unknown locations or days are NaN.
+        """
+        block = self.locations.get_indexer([location_key(location) for location in locations])
+        days = _to_days(dates)
+
+        # Position of each requested day inside its location's block
+        known = block >= 0
+        safe_block = np.where(known, block, 0)
+        position = days[:, None] - self.starts[safe_block][:, None] - np.arange(history + 1)[None, :]
+        valid = known[:, None] & (position >= 0) & (position < self.lengths[safe_block][:, None])
+        rows = np.where(valid, self.offsets[safe_block][:, None] + position, 0)
+
+        column_index = slice(None) if columns is None else [self.columns.index(col) for col in columns]
+        if len(self.values) == 0:
+            width = len(self.columns) if columns is None else len(columns)
+            return np.full(rows.shape + (width,), np.nan)
+        result = self.values[rows][:, :, column_index]
+        result[~valid] = np.nan
+        return result
+
+    def lookup(self, location, date, history=0, columns=None):
+        """
+        Weather for one location on one day
+
+        Returns:
+            np.ndarray: (history + 1) x n_columns, row k is the weather k days before `date`
+        """
+        return self.lookup_many([location], [date], history, columns)[0]
+
+    def features(self, locations, dates, columns=None):
+        """Same-day weather as an n_pairs x n_columns matrix"""
+        return self.lookup_many(locations, dates, 0, columns)[:, 0, :]
+
+    def join(self, frame, columns=None, history=0, location_column='Location', date_column='Date'):
+        """
+        Weather columns for each row of a frame, e.g. avalanche records for training
+
+        History columns are suffixed with the lag in days (tempC_1, tempC_2, ...).
+        """
+        columns = list(columns or self.columns)
+        values = self.lookup_many(frame[location_column], frame[date_column], history, columns)
+        names = [col if lag == 0 else f'{col}_{lag}' for lag in range(history + 1) for col in columns]
+        return pd.DataFrame(values.reshape(len(frame), -1), columns=names, index=frame.index)
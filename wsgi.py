@@ -4,7 +4,15 @@ WSGI entry point for production deployment
 """
 
 import os
-from app import app
+from app import app, initialize_predictor, start_background_init
+
+if os.environ.get('PRELOAD_MODELS', '').lower() in ('1', 'true', 'yes'):
+    # Preloaded by the gunicorn master: load everything before the workers
+    # fork so they share it. No threads here, they would not survive the fork.
+    initialize_predictor()
+else:
+    # Load data and models without delaying the first request
+    start_background_init()
 
 if __name__ == "__main__":
     port = int(os.environ.get('PORT', 5000))